@@ -0,0 +1,128 @@
+import datetime
+from metadata import TableMetadata
+from utils import (
+    Aggregate,
+    AggregateNotAllowed,
+    AggregateTypeError,
+    AmbiguousReference,
+    ColumnNotFoundError,
+    ColumnNotGrouped,
+    TableNotSpecified,
+)
+
+# in this file, the binder resolving column references of a query is defined.
+# references are resolved once per query against the schema of referred tables,
+# so evaluating a row never has to search for a column.
+
+
+class BoundColumn:
+    def __init__(self, table_name, column_name, key, type_str):
+        self.table_name = table_name
+        self.column_name = column_name
+        self.key = key  # position of the value in a (joined) row tuple
+        self.type_str = type_str
+
+    # python type of the values held by the column
+    def value_type(self):
+        if self.type_str == "int":
+            return int
+        elif self.type_str == "date":
+            return datetime.datetime
+        return str
+
+
+class Binder:
+    def __init__(self, table_metadata_list: dict[str, TableMetadata]):
+        self.table_metadata_list = table_metadata_list
+
+        # joined rows concatenate the row tuples of the tables in this order,
+        # so each table's values start at the width of the tables before it
+        self.table_offsets = {}
+        offset = 0
+        for table_name, table_metadata in table_metadata_list.items():
+            self.table_offsets[table_name] = offset
+            offset += len(table_metadata.columns)
+
+        # column name -> tables having a column of that name
+        self.column_owners = {}
+        for table_name, table_metadata in table_metadata_list.items():
+            for col_name in table_metadata.columns:
+                self.column_owners.setdefault(col_name, []).append(table_name)
+
+    # resolve a ColumnReference to a BoundColumn
+    # raises TableNotSpecified, ColumnNotFoundError or AmbiguousReference,
+    # AggregateNotAllowed for an aggregate, which rows do not hold
+    def bind(self, column_reference) -> BoundColumn:
+        if isinstance(column_reference, Aggregate):
+            raise AggregateNotAllowed
+        col_name = column_reference.column.lower()
+        if column_reference.table is not None:
+            table_name = column_reference.table.lower()
+            if table_name not in self.table_metadata_list:
+                raise TableNotSpecified
+            if col_name not in self.table_metadata_list[table_name].columns:
+                raise ColumnNotFoundError
+        else:
+            owner_tables = self.column_owners.get(col_name, [])
+            if len(owner_tables) == 0:
+                raise ColumnNotFoundError
+            elif len(owner_tables) > 1:
+                raise AmbiguousReference
+            table_name = owner_tables[0]
+
+        table_metadata = self.table_metadata_list[table_name]
+        return BoundColumn(
+            table_name,
+            col_name,
+            self.table_offsets[table_name]
+            + table_metadata.get_column_position(col_name),
+            table_metadata.columns[col_name]["type"],
+        )
+
+
+# binder of a grouped query, resolving references against aggregated rows:
+# the GROUP BY column values followed by one result per aggregate
+class GroupBinder:
+    def __init__(self, binder: Binder, group_columns: list[BoundColumn]):
+        self.binder = binder
+        self.group_columns = group_columns
+        # (function, key of the argument in an input row or None for COUNT(*))
+        # of each aggregate, in the order of their results in a row
+        self.aggregates = []
+
+    # resolve a grouped ColumnReference or an Aggregate to a BoundColumn
+    # raises ColumnNotGrouped, AggregateTypeError or the errors of Binder.bind
+    def bind(self, reference) -> BoundColumn:
+        if isinstance(reference, Aggregate):
+            return self.bind_aggregate(reference)
+        bound_column = self.binder.bind(reference)
+        for position, group_column in enumerate(self.group_columns):
+            if group_column.key == bound_column.key:
+                return BoundColumn(
+                    bound_column.table_name,
+                    bound_column.column_name,
+                    position,
+                    bound_column.type_str,
+                )
+        raise ColumnNotGrouped(bound_column.column_name)
+
+    # the same aggregate used twice is computed once
+    def bind_aggregate(self, aggregate: Aggregate) -> BoundColumn:
+        key = None
+        type_str = "int"
+        if aggregate.column_reference is not None:
+            bound_column = self.binder.bind(aggregate.column_reference)
+            key = bound_column.key
+            if aggregate.function in ("sum", "avg") and bound_column.type_str != "int":
+                raise AggregateTypeError(aggregate.function, bound_column.column_name)
+            if aggregate.function in ("min", "max"):
+                type_str = bound_column.type_str
+
+        if (aggregate.function, key) not in self.aggregates:
+            self.aggregates.append((aggregate.function, key))
+        return BoundColumn(
+            None,
+            str(aggregate),
+            len(self.group_columns) + self.aggregates.index((aggregate.function, key)),
+            type_str,
+        )
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+# in this file, the buffer pool keeping decoded rows in memory is defined.
+# rows are grouped by table; a table read by a full scan is kept complete,
+# so the next scan iterates memory instead of unpickling every record again.
+# writes update the pool and are tracked as dirty until the database
+# flushes them to the storage, at the latest when the statement commits.
+
+# memory charged for a cached row on top of its pickled size
+ROW_OVERHEAD = 100
+
+
+class BufferedTable:
+    def __init__(self):
+        self.rows = {}  # row_id -> decoded row, in row id order when complete
+        self.row_sizes = {}  # row_id -> memory charged for the row
+        self.complete = False  # every row of the table is in rows
+        # row_id -> pickled row to write, None for a row to delete
+        self.dirty = {}
+        self.size = 0  # rows and dirty rows
+        self.dirty_size = 0
+
+
+# least recently used tables without dirty rows are evicted once the
+# memory budget (in bytes) is exceeded
+class BufferPool:
+    def __init__(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.tables = OrderedDict()
+        self.size = 0
+        self.dirty_size = 0
+        self.write_count = 0  # rows put or deleted so far
+
+    def get_table(self, table_id, create=False):
+        table = self.tables.get(table_id)
+        if table is None and create:
+            table = self.tables[table_id] = BufferedTable()
+        if table is not None:
+            self.tables.move_to_end(table_id)
+        return table
+
+    # rows of the table in row id order, None if the table is not complete
+    def get_rows(self, table_id):
+        table = self.get_table(table_id)
+        if table is None or not table.complete:
+            return None
+        return table.rows
+
+    # (found, row) of a row id, a deleted row is found as None
+    def get_row(self, table_id, row_id):
+        table = self.get_table(table_id)
+        if table is None:
+            return False, None
+        row = table.rows.get(row_id)
+        if row is not None:
+            return True, row
+        return table.complete or row_id in table.dirty, None
+
+    # keep the rows of a whole table read from the storage, unless rows
+    # were written since write_count was taken, when the read started
+    def load_table(self, table_id, rows, row_sizes, write_count):
+        size = sum(row_sizes.values())
+        if size > self.memory_budget or write_count != self.write_count:
+            return
+        table = self.get_table(table_id, create=True)
+        self.size += size - table.size
+        table.rows = rows
+        table.row_sizes = row_sizes
+        table.complete = True
+        table.size = size
+        self.evict()
+
+    # keep a single row read from the storage
+    def cache_row(self, table_id, row_id, row, row_serialized):
+        table = self.get_table(table_id, create=True)
+        self.set_row(table, row_id, row, row_serialized)
+        self.evict()
+
+    def put_row(self, table_id, row_id, row, row_serialized):
+        table = self.get_table(table_id, create=True)
+        self.set_row(table, row_id, row, row_serialized)
+        self.mark_dirty(table, row_id, row_serialized)
+        self.write_count += 1
+
+    def delete_row(self, table_id, row_id):
+        table = self.get_table(table_id, create=True)
+        size = table.row_sizes.pop(row_id, 0)
+        table.rows.pop(row_id, None)
+        table.size -= size
+        self.size -= size
+        self.mark_dirty(table, row_id, None)
+        self.write_count += 1
+
+    def set_row(self, table, row_id, row, row_serialized):
+        size = ROW_OVERHEAD + len(row_serialized)
+        size_change = size - table.row_sizes.get(row_id, 0)
+        table.rows[row_id] = row
+        table.row_sizes[row_id] = size
+        table.size += size_change
+        self.size += size_change
+
+    def mark_dirty(self, table, row_id, row_serialized):
+        size = ROW_OVERHEAD + (len(row_serialized) if row_serialized else 0)
+        if row_id in table.dirty:
+            previous = table.dirty[row_id]
+            size -= ROW_OVERHEAD + (len(previous) if previous else 0)
+        table.dirty[row_id] = row_serialized
+        table.size += size
+        table.dirty_size += size
+        self.size += size
+        self.dirty_size += size
+
+    # (table_id, row_id, pickled row or None) of every dirty row,
+    # which are clean once returned
+    def take_dirty(self):
+        dirty_rows = []
+        for table_id, table in self.tables.items():
+            for row_id, row_serialized in table.dirty.items():
+                dirty_rows.append((table_id, row_id, row_serialized))
+            table.dirty = {}
+            table.size -= table.dirty_size
+            table.dirty_size = 0
+        self.size -= self.dirty_size
+        self.dirty_size = 0
+        self.evict()
+        return dirty_rows
+
+    # forget a table, including its dirty rows
+    def drop_table(self, table_id):
+        self.write_count += 1
+        table = self.tables.pop(table_id, None)
+        if table is not None:
+            self.size -= table.size
+            self.dirty_size -= table.dirty_size
+
+    def clear(self):
+        self.tables.clear()
+        self.size = 0
+        self.dirty_size = 0
+
+    def evict(self):
+        for table_id in list(self.tables):
+            if self.size <= self.memory_budget:
+                break
+            if not self.tables[table_id].dirty:
+                self.drop_table(table_id)
@@ -1,71 +1,780 @@
+import contextlib
+import csv
 import datetime
+import os
 from berkeleydb import db
 import pickle
+import tracemalloc
+import storage
 from utils import (
+    Aggregate,
+    AggregateNotAllowed,
+    AggregateTypeError,
     AmbiguousReference,
     BooleanCondition,
     ColumnNotFoundError,
+    ColumnNotGrouped,
     ColumnReference,
     Condition,
     IncomparableTypeError,
+    InsertError,
     LiteralValue,
+    NonNullableError,
     NullCondition,
     TableNotSpecified,
-    evaluate_condition,
-    get_value,
+    TypeMismatchError,
+    collect_column_predicates,
+    collect_literals,
+    combine_conjuncts,
+    compile_condition,
+    find_index_bounds,
+    find_primary_key_values,
+    get_referenced_tables,
+    split_conjuncts,
 )
 from messages import MessageHandler, MessageKeys
-from metadata import TableMetadata, ForeignKeyMetadata
+from metadata import IndexMetadata, TableMetadata, ForeignKeyMetadata
 from formatter import Formatter
-from itertools import product
+from binder import Binder, GroupBinder
+from plan_cache import PlanCache, PreparedStatement
+from buffer_pool import ROW_OVERHEAD, BufferPool
+from table_stats import TableStatistics, collect_statistics
+from operators import (
+    CrossJoin,
+    Filter,
+    HashAggregate,
+    HashJoin,
+    Limit,
+    Project,
+    Scan,
+    Sort,
+    TopK,
+    analyze_plan,
+    make_join_key,
+    walk_plan,
+)
+
+# rows written to the storage at once by a bulk load
+COPY_BATCH_SIZE = 10000
+
+# directory of the Berkeley DB environment holding myDB.db and its log
+DB_HOME = "myDB"
+
+# autocommitted statements whose commits share one log flush
+# statements of one input share it as well, the log is flushed before the
+# next prompt, so a commit is durable once the session waits for input
+GROUP_COMMIT_SIZE = 32
+
+# memory in bytes the buffer pool may use for decoded rows
+BUFFER_POOL_BUDGET = 64 * 1024 * 1024
+
+# memory in bytes ORDER BY may hold before sorted runs are spilled to disk
+SORT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# an index scan estimated to read more than this fraction of a table's rows
+# is replaced by a full scan, which reads rows in storage order
+INDEX_SCAN_MAX_FRACTION = 0.2
 
 
 class Database:
-    def __init__(self):
-        self.db = db.DB()
-        self.db.open("myDB.db", dbtype=db.DB_HASH, flags=db.DB_CREATE)
+    def __init__(
+        self,
+        buffer_pool_budget=BUFFER_POOL_BUDGET,
+        sort_memory_budget=SORT_MEMORY_BUDGET,
+    ):
+        os.makedirs(DB_HOME, exist_ok=True)
+        self.env = db.DBEnv()
+        # commits write the log without forcing it to disk, the log is flushed
+        # once per GROUP_COMMIT_SIZE autocommits, before the next prompt, on
+        # COMMIT and on exit. a crash while an input is running loses at most
+        # its unflushed commits, never half of one
+        self.env.set_flags(db.DB_TXN_WRITE_NOSYNC, True)
+        self.env.open(
+            DB_HOME,
+            db.DB_CREATE
+            | db.DB_RECOVER
+            | db.DB_INIT_MPOOL
+            | db.DB_INIT_LOCK
+            | db.DB_INIT_LOG
+            | db.DB_INIT_TXN,
+        )
+        self.db = db.DB(self.env)
+        self.db.set_get_returns_none(2)
+        # B-tree keeps keys ordered, so each table's rows form one key range
+        self.db.open(
+            "myDB.db", dbtype=db.DB_BTREE, flags=db.DB_CREATE | db.DB_AUTO_COMMIT
+        )
+
+        # transaction opened by BEGIN, None in autocommit mode
+        self.transaction = None
+        # transaction of the running statement, a child of self.transaction
+        # so a failing statement is undone without ending the transaction
+        self.txn = None
+        self.unflushed_commits = 0
+
+        # next row id of each table, looked up once per session
+        self.next_row_ids = {}
+        # prepared SELECT and DELETE statements, see plan_cache.py
+        self.plan_cache = PlanCache()
+        # decoded rows, written back when a statement commits
+        self.buffer_pool = BufferPool(buffer_pool_budget)
+        # table name -> TableStatistics or None, see table_stats.py
+        self.table_statistics = {}
+        self.sort_memory_budget = sort_memory_budget
+
+    # run one statement in its own transaction, committed when it completes
+    # and aborted if it raises
+    @contextlib.contextmanager
+    def statement(self):
+        self.txn = self.env.txn_begin(self.transaction)
+        try:
+            yield
+        except BaseException:
+            if self.txn is not None:
+                self.txn.abort()
+                self.discard_cached_state()
+            raise
+        else:
+            if self.txn is not None:
+                self.flush_buffer_pool()
+                self.txn.commit()
+                if self.transaction is None:
+                    self.group_commit()
+        finally:
+            self.txn = None
+
+    # undo the writes of the running statement and continue it in a new
+    # transaction, for statements which report their own failure
+    def rollback_statement(self):
+        self.txn.abort()
+        self.discard_cached_state()
+        self.txn = self.env.txn_begin(self.transaction)
+
+    def group_commit(self):
+        self.unflushed_commits += 1
+        if self.unflushed_commits >= GROUP_COMMIT_SIZE:
+            self.flush_log()
+
+    # force the commits written so far to disk
+    def flush_log(self):
+        if self.unflushed_commits:
+            self.env.log_flush()
+            self.unflushed_commits = 0
+
+    # row id counters, cached statements and buffered rows may describe
+    # undone writes
+    def discard_cached_state(self):
+        self.next_row_ids = {}
+        self.plan_cache.clear()
+        self.buffer_pool.clear()
+        self.table_statistics = {}
+
+    # write the dirty rows of the buffer pool in the running transaction
+    def flush_buffer_pool(self):
+        for table_id, row_id, row_serialized in self.buffer_pool.take_dirty():
+            key = storage.row_key(table_id, row_id)
+            if row_serialized is not None:
+                self.db.put(key, row_serialized, txn=self.txn)
+            else:
+                try:
+                    self.db.delete(key, txn=self.txn)
+                except db.DBNotFoundError:
+                    # the row was inserted and deleted before any flush
+                    pass
+
+    def begin_transaction(self):
+        if self.transaction is not None:
+            MessageHandler.print_error(MessageKeys.TRANSACTION_IN_PROGRESS_ERROR)
+            return
+        # BEGIN itself writes nothing, its statement transaction ends here
+        self.txn.commit()
+        self.txn = None
+        self.transaction = self.env.txn_begin()
+        MessageHandler.print_success(MessageKeys.BEGIN_SUCCESS)
+
+    def commit_transaction(self):
+        if self.transaction is None:
+            MessageHandler.print_error(
+                MessageKeys.NO_TRANSACTION_ERROR, command_name="Commit"
+            )
+            return
+        self.flush_buffer_pool()
+        self.txn.commit()
+        self.txn = None
+        # an explicit COMMIT is durable at once, with the commits before it
+        self.transaction.commit(db.DB_TXN_SYNC)
+        self.transaction = None
+        self.unflushed_commits = 0
+        MessageHandler.print_success(MessageKeys.COMMIT_SUCCESS)
+
+    def rollback_transaction(self):
+        if self.transaction is None:
+            MessageHandler.print_error(
+                MessageKeys.NO_TRANSACTION_ERROR, command_name="Rollback"
+            )
+            return
+        self.txn.abort()
+        self.txn = None
+        self.transaction.abort()
+        self.transaction = None
+        self.discard_cached_state()
+        MessageHandler.print_success(MessageKeys.ROLLBACK_SUCCESS)
 
     # Abstracted functions to manipulate db file.
     def get_table_metadata(self, table_name):
-        table_meta_data_serialized = self.db.get(f"table_schema:{table_name}".encode())
+        table_meta_data_serialized = self.db.get(
+            f"table_schema:{table_name}".encode(), txn=self.txn
+        )
         if not table_meta_data_serialized:
             return None
 
         table_meta_data: TableMetadata = pickle.loads(table_meta_data_serialized)
         return table_meta_data
 
+    # cached statements hold the metadata they were bound against,
+    # so every schema change drops the statements referring to the table.
+    # statements prepared on a parent table hold the metadata of the tables
+    # referencing it, to delete or update their rows, and are dropped too
     def put_table_metadata(self, table_name, table_metadata):
-        self.db.put(f"table_schema:{table_name}".encode(), pickle.dumps(table_metadata))
+        self.db.put(
+            f"table_schema:{table_name}".encode(),
+            pickle.dumps(table_metadata),
+            txn=self.txn,
+        )
+        self.plan_cache.invalidate(table_name)
+        for fk in table_metadata.fk_constraints:
+            self.plan_cache.invalidate(fk["ref_table"].lower())
 
     def delete_table_metadata(self, table_name):
-        self.db.delete(f"table_schema:{table_name}".encode())
+        self.db.delete(f"table_schema:{table_name}".encode(), txn=self.txn)
+        self.plan_cache.invalidate(table_name)
+
+    # table_stats:{table_name} holds the statistics of the last ANALYZE,
+    # None if the table was never analyzed
+    def get_table_statistics(self, table_name):
+        if table_name not in self.table_statistics:
+            table_stats_serialized = self.db.get(
+                f"table_stats:{table_name}".encode(), txn=self.txn
+            )
+            self.table_statistics[table_name] = (
+                pickle.loads(table_stats_serialized) if table_stats_serialized else None
+            )
+        return self.table_statistics[table_name]
 
-    def get_table_data(self, table_name):
-        table_data_serialized = self.db.get(f"table_data:{table_name}".encode())
-        if not table_data_serialized:
+    def put_table_statistics(self, table_name, table_stats: TableStatistics):
+        self.db.put(
+            f"table_stats:{table_name}".encode(),
+            pickle.dumps(table_stats),
+            txn=self.txn,
+        )
+        self.table_statistics[table_name] = table_stats
+
+    def delete_table_statistics(self, table_name):
+        key = f"table_stats:{table_name}".encode()
+        if self.db.exists(key, txn=self.txn):
+            self.db.delete(key, txn=self.txn)
+        self.table_statistics.pop(table_name, None)
+
+    # index_schema:{index_name} maps an index to the table owning it
+    def get_index_table_name(self, index_name):
+        table_name = self.db.get(f"index_schema:{index_name}".encode(), txn=self.txn)
+        if not table_name:
             return None
-        return pickle.loads(table_data_serialized)
+        return table_name.decode()
+
+    def put_index_table_name(self, index_name, table_name):
+        self.db.put(
+            f"index_schema:{index_name}".encode(), table_name.encode(), txn=self.txn
+        )
+
+    def delete_index_table_name(self, index_name):
+        self.db.delete(f"index_schema:{index_name}".encode(), txn=self.txn)
+
+    # table and index ids are drawn from counters stored in the db
+    def allocate_id(self, counter_key):
+        next_id_serialized = self.db.get(counter_key, txn=self.txn)
+        next_id = (
+            storage.decode_counter(next_id_serialized) if next_id_serialized else 0
+        )
+        self.db.put(counter_key, storage.encode_counter(next_id + 1), txn=self.txn)
+        return next_id
+
+    # reserve count consecutive row ids, returns the first one
+    def allocate_row_ids(self, table_id, count):
+        if table_id not in self.next_row_ids:
+            # the last key of the table's range holds the largest row id
+            cursor = self.db.cursor(self.txn)
+            prefix = storage.row_key_prefix(table_id)
+            record = cursor.set_range(storage.prefix_end(prefix))
+            record = cursor.prev() if record else cursor.last()
+            cursor.close()
+            if record and record[0].startswith(prefix):
+                self.next_row_ids[table_id] = storage.row_id_from_key(record[0]) + 1
+            else:
+                self.next_row_ids[table_id] = 0
+
+        row_id = self.next_row_ids[table_id]
+        self.next_row_ids[table_id] = row_id + count
+        return row_id
+
+    def allocate_row_id(self, table_id):
+        return self.allocate_row_ids(table_id, 1)
+
+    # iterate (row_id, row) pairs of a table in row id order
+    # a table read completely is kept in the buffer pool for the next scan
+    def scan_table_data(self, table_metadata: TableMetadata):
+        table_id = table_metadata.table_id
+        rows = self.buffer_pool.get_rows(table_id)
+        if rows is not None:
+            yield from list(rows.items())
+            return
 
-    def put_table_data(self, table_name, data):
-        self.db.put(f"table_data:{table_name}".encode(), pickle.dumps(data))
+        # the storage has to hold the pending writes before it is read
+        self.flush_buffer_pool()
+        write_count = self.buffer_pool.write_count
+        rows = {}
+        row_sizes = {}
+        size = 0
+        prefix = storage.row_key_prefix(table_id)
+        cursor = self.db.cursor(self.txn)
+        try:
+            record = cursor.set_range(prefix)
+            while record and record[0].startswith(prefix):
+                key, row_serialized = record
+                row_id = storage.row_id_from_key(key)
+                row = storage.decode_row(row_serialized)
+                if rows is not None:
+                    rows[row_id] = row
+                    row_sizes[row_id] = ROW_OVERHEAD + len(row_serialized)
+                    size += row_sizes[row_id]
+                    if size > self.buffer_pool.memory_budget:
+                        rows = None
+                yield row_id, row
+                record = cursor.next()
+        finally:
+            cursor.close()
+        if rows is not None:
+            self.buffer_pool.load_table(table_id, rows, row_sizes, write_count)
+
+    def get_row(self, table_metadata: TableMetadata, row_id):
+        found, row = self.buffer_pool.get_row(table_metadata.table_id, row_id)
+        if found:
+            return row
+        row_serialized = self.db.get(
+            storage.row_key(table_metadata.table_id, row_id), txn=self.txn
+        )
+        if not row_serialized:
+            return None
+        row = storage.decode_row(row_serialized)
+        self.buffer_pool.cache_row(table_metadata.table_id, row_id, row, row_serialized)
+        return row
+
+    # row records are written through the buffer pool, index entries at once
+    def write_row(self, table_metadata: TableMetadata, row_id, row):
+        self.buffer_pool.put_row(
+            table_metadata.table_id, row_id, row, storage.encode_row(row)
+        )
+        if self.buffer_pool.dirty_size > self.buffer_pool.memory_budget:
+            self.flush_buffer_pool()
+
+    def put_row(self, table_metadata: TableMetadata, row):
+        row_id = self.allocate_row_id(table_metadata.table_id)
+        self.write_row(table_metadata, row_id, row)
+        if table_metadata.pk_sets:
+            self.db.put(
+                self.get_primary_key(table_metadata, row),
+                storage.encode_row_id(row_id),
+                txn=self.txn,
+            )
+        for index_metadata in table_metadata.indexes.values():
+            self.db.put(
+                self.get_index_key(table_metadata, index_metadata, row, row_id),
+                b"",
+                txn=self.txn,
+            )
+        return row_id
+
+    # write many rows at once: row records go in row id order, then the
+    # primary key and index entries sorted by key, so each B-tree is filled
+    # front to back instead of at random positions. returns the row count
+    def put_rows(self, table_metadata: TableMetadata, rows):
+        first_row_id = self.allocate_row_ids(table_metadata.table_id, len(rows))
+        row_ids = range(first_row_id, first_row_id + len(rows))
+        for row_id, row in zip(row_ids, rows):
+            self.write_row(table_metadata, row_id, row)
+
+        if table_metadata.pk_sets:
+            for pk_key, row_id in sorted(
+                (self.get_primary_key(table_metadata, row), row_id)
+                for row_id, row in zip(row_ids, rows)
+            ):
+                self.db.put(pk_key, storage.encode_row_id(row_id), txn=self.txn)
+        for index_metadata in table_metadata.indexes.values():
+            for index_key in sorted(
+                self.get_index_key(table_metadata, index_metadata, row, row_id)
+                for row_id, row in zip(row_ids, rows)
+            ):
+                self.db.put(index_key, b"", txn=self.txn)
+        return len(rows)
+
+    def delete_row(self, table_metadata: TableMetadata, row_id, row):
+        self.buffer_pool.delete_row(table_metadata.table_id, row_id)
+        if table_metadata.pk_sets:
+            self.db.delete(self.get_primary_key(table_metadata, row), txn=self.txn)
+        for index_metadata in table_metadata.indexes.values():
+            self.db.delete(
+                self.get_index_key(table_metadata, index_metadata, row, row_id),
+                txn=self.txn,
+            )
 
-    def delete_table_data(self, table_name):
-        self.db.delete(f"table_data:{table_name}".encode())
+    # replace rows in place: (row_id, old row, new row) triples
+    # old index entries are all removed before new ones are added, so rows
+    # exchanging key values do not collide
+    def update_rows(self, table_metadata: TableMetadata, changed_rows):
+        moved_entries = []
+        for row_id, row, new_row in changed_rows:
+            self.write_row(table_metadata, row_id, new_row)
+
+            if table_metadata.pk_sets:
+                old_key = self.get_primary_key(table_metadata, row)
+                new_key = self.get_primary_key(table_metadata, new_row)
+                if old_key != new_key:
+                    self.db.delete(old_key, txn=self.txn)
+                    moved_entries.append((new_key, storage.encode_row_id(row_id)))
+            for index_metadata in table_metadata.indexes.values():
+                old_key = self.get_index_key(
+                    table_metadata, index_metadata, row, row_id
+                )
+                new_key = self.get_index_key(
+                    table_metadata, index_metadata, new_row, row_id
+                )
+                if old_key != new_key:
+                    self.db.delete(old_key, txn=self.txn)
+                    moved_entries.append((new_key, b""))
+
+        for key, value in moved_entries:
+            self.db.put(key, value, txn=self.txn)
+
+    def delete_key_range(self, prefix):
+        cursor = self.db.cursor(self.txn)
+        deleted_count = 0
+        record = cursor.set_range(prefix)
+        while record and record[0].startswith(prefix):
+            cursor.delete()
+            deleted_count += 1
+            record = cursor.next()
+        cursor.close()
+        return deleted_count
+
+    def delete_table_data(self, table_metadata: TableMetadata):
+        # rows still pending in the buffer pool are counted and deleted too
+        self.flush_buffer_pool()
+        self.buffer_pool.drop_table(table_metadata.table_id)
+        self.delete_key_range(storage.primary_key_prefix(table_metadata.table_id))
+        for index_metadata in table_metadata.indexes.values():
+            self.delete_key_range(storage.index_prefix(index_metadata.index_id))
+        deleted_count = self.delete_key_range(
+            storage.row_key_prefix(table_metadata.table_id)
+        )
+        self.next_row_ids.pop(table_metadata.table_id, None)
+        return deleted_count
+
+    # primary key index: encoded primary key -> row id, one B-tree probe per lookup
+    def get_primary_key(self, table_metadata: TableMetadata, row):
+        return storage.primary_key(
+            table_metadata.table_id,
+            [
+                row[table_metadata.get_column_position(col)]
+                for col in table_metadata.pk_sets
+            ],
+        )
 
-    def get_foreign_key_metadata(self):
-        fk_metadata_serialized = self.db.get("foreign_key_metadata".encode())
+    def lookup_primary_key(self, table_metadata: TableMetadata, pk_values):
+        row_id_serialized = self.db.get(
+            storage.primary_key(table_metadata.table_id, pk_values), txn=self.txn
+        )
+        if not row_id_serialized:
+            return None
+        return storage.decode_row_id(row_id_serialized)
+
+    # secondary index: encoded index key + row id, kept in value order
+    def get_index_key(
+        self,
+        table_metadata: TableMetadata,
+        index_metadata: IndexMetadata,
+        row,
+        row_id,
+    ):
+        return storage.index_key(
+            index_metadata.index_id,
+            [
+                row[table_metadata.get_column_position(col)]
+                for col in index_metadata.column_list
+            ],
+            row_id,
+        )
+
+    # (row_id, row) pairs of the index entries in key range [start, end)
+    def scan_index_range(
+        self, table_metadata: TableMetadata, start, end, is_primary_key
+    ):
+        cursor = self.db.cursor(self.txn)
+        try:
+            record = cursor.set_range(start)
+            while record and record[0] < end:
+                key, value = record
+                row_id = (
+                    storage.decode_row_id(value)
+                    if is_primary_key
+                    else storage.row_id_from_index_key(key)
+                )
+                yield row_id, self.get_row(table_metadata, row_id)
+                record = cursor.next()
+        finally:
+            cursor.close()
+
+    # (row_id, row) pairs of a table which may satisfy condition
+    # a condition fixing the whole primary key becomes a single index lookup,
+    # otherwise the index whose equality/range bounds cover the most leading
+    # columns is scanned, falling back to a full table scan. once the table
+    # is analyzed, an index scan reading a large part of it is not used
+    def scan_table_candidates(self, table_metadata: TableMetadata, condition):
+        _, scan = self.choose_access_path(table_metadata, condition)
+        return scan()
+
+    # (description, function returning the (row_id, row) pairs) of the access
+    # path scan_table_candidates uses for condition
+    def choose_access_path(self, table_metadata: TableMetadata, condition):
+        predicates = collect_column_predicates(condition, table_metadata)
+
+        pk_values = find_primary_key_values(predicates, table_metadata.pk_sets)
+        if pk_values is not None:
+
+            def lookup():
+                row_id = self.lookup_primary_key(table_metadata, pk_values)
+                if row_id is None:
+                    return []
+                return [(row_id, self.get_row(table_metadata, row_id))]
+
+            return "primary key lookup", lookup
+
+        access_paths = [
+            (
+                f"index {index_metadata.index_name}",
+                storage.index_prefix(index_metadata.index_id),
+                index_metadata.column_list,
+                False,
+            )
+            for index_metadata in table_metadata.indexes.values()
+        ]
+        if table_metadata.pk_sets:
+            access_paths.append(
+                (
+                    "primary key",
+                    storage.primary_key_prefix(table_metadata.table_id),
+                    table_metadata.pk_sets,
+                    True,
+                )
+            )
+
+        best_path = None
+        for name, prefix, column_list, is_primary_key in access_paths:
+            bounds = find_index_bounds(predicates, column_list)
+            if bounds is None:
+                continue
+            eq_values, lower, upper = bounds
+            rank = (len(eq_values), lower is not None or upper is not None)
+            if best_path is None or rank > best_path[0]:
+                best_path = (rank, name, prefix, column_list, bounds, is_primary_key)
+
+        table_stats = self.get_table_statistics(table_metadata.table_name)
+        full_scan = "full scan"
+        if table_stats is not None:
+            full_scan += f", ~{table_stats.row_count} rows"
+
+        if best_path is None:
+            return full_scan, lambda: self.scan_table_data(table_metadata)
+
+        _, name, prefix, column_list, bounds, is_primary_key = best_path
+        description = f"range scan of {name}"
+        if table_stats is not None:
+            fraction = table_stats.estimate_fraction(column_list, *bounds)
+            if fraction > INDEX_SCAN_MAX_FRACTION:
+                return (
+                    f"{full_scan}, {name} would read {fraction:.0%}",
+                    lambda: self.scan_table_data(table_metadata),
+                )
+            description += f", ~{round(fraction * table_stats.row_count)} rows"
+
+        start, end = storage.index_key_range(prefix, *bounds)
+        return description, lambda: self.scan_index_range(
+            table_metadata, start, end, is_primary_key
+        )
+
+    # (parent table id, positions of the referencing columns in the order of
+    # the parent's primary key) of each foreign key of table_metadata
+    def get_parent_references(self, table_metadata: TableMetadata):
+        parent_references = []
+        for fk in table_metadata.fk_constraints:
+            parent_metadata = self.get_table_metadata(fk["ref_table"].lower())
+            child_columns = dict(zip(fk["other_key_list"], fk["key_list"]))
+            parent_references.append(
+                (
+                    parent_metadata.table_id,
+                    [
+                        table_metadata.get_column_position(child_columns[col])
+                        for col in parent_metadata.pk_sets
+                    ],
+                )
+            )
+        return parent_references
+
+    # whether every row referenced by row exists, one primary key probe each
+    # a foreign key holding NULL references nothing
+    def parent_rows_exist(self, parent_references, row):
+        for parent_table_id, positions in parent_references:
+            values = [row[position] for position in positions]
+            if any(value is None for value in values):
+                continue
+            if not self.db.exists(
+                storage.primary_key(parent_table_id, values), txn=self.txn
+            ):
+                return False
+        return True
+
+    # (child table metadata, index on the foreign key columns, positions of
+    # the referenced columns in index column order, ON DELETE action) of each
+    # foreign key referencing table_metadata
+    def get_child_references(self, table_metadata: TableMetadata):
+        child_references = []
+        for fk in self.get_foreign_key_metadata("parent", table_metadata.table_name):
+            child_metadata = self.get_table_metadata(fk.child_table_name)
+            index_metadata = child_metadata.indexes[fk.index_name]
+            parent_columns = dict(
+                zip(fk.child_column_name_list, fk.referenced_parent_column_list)
+            )
+            child_references.append(
+                (
+                    child_metadata,
+                    index_metadata,
+                    [
+                        table_metadata.get_column_position(parent_columns[col])
+                        for col in index_metadata.column_list
+                    ],
+                    fk.on_delete_action,
+                )
+            )
+        return child_references
+
+    # prefix of the foreign key index entries of the rows referencing row
+    def get_reference_prefix(self, index_metadata: IndexMetadata, positions, row):
+        return storage.index_prefix(index_metadata.index_id) + storage.encode_key(
+            [row[position] for position in positions]
+        )
+
+    # name of a table having rows which reference row, None if there is none
+    # one probe of the child's foreign key index per reference
+    def find_referencing_table(self, child_references, row):
+        for child_metadata, index_metadata, positions, _ in child_references:
+            prefix = self.get_reference_prefix(index_metadata, positions, row)
+            cursor = self.db.cursor(self.txn)
+            try:
+                record = cursor.set_range(prefix)
+            finally:
+                cursor.close()
+            if record and record[0].startswith(prefix):
+                return child_metadata.table_name
+        return None
+
+    # (row_id, row) pairs of the rows referencing any of rows through a
+    # child reference, one range scan of the foreign key index per row
+    def find_referencing_rows(self, child_reference, rows):
+        child_metadata, index_metadata, positions, _ = child_reference
+        referencing_rows = []
+        for _, row in rows:
+            prefix = self.get_reference_prefix(index_metadata, positions, row)
+            referencing_rows.extend(
+                self.scan_index_range(
+                    child_metadata, prefix, storage.prefix_end(prefix), False
+                )
+            )
+        return referencing_rows
+
+    # delete rows, (row_id, row) pairs, applying ON DELETE of the foreign
+    # keys referencing them: referencing rows are deleted (recursively) or
+    # have their foreign key set to NULL, a batch per child table.
+    # returns the name of a table whose rows still reference the deleted ones,
+    # None on success. the caller undoes the statement on failure
+    def delete_rows(self, table_metadata: TableMetadata, rows, child_references):
+        for child_reference in child_references:
+            child_metadata, index_metadata, _, on_delete_action = child_reference
+            if on_delete_action == "no action":
+                continue
+            child_rows = self.find_referencing_rows(child_reference, rows)
+            if not child_rows:
+                continue
+            if on_delete_action == "cascade":
+                child_table_name = self.delete_rows(
+                    child_metadata,
+                    child_rows,
+                    self.get_child_references(child_metadata),
+                )
+                if child_table_name is not None:
+                    return child_table_name
+            else:
+                # set null columns are never part of a primary key, so no
+                # table references them and nothing cascades further
+                null_positions = [
+                    child_metadata.get_column_position(col)
+                    for col in index_metadata.column_list
+                ]
+                changed_rows = []
+                for row_id, row in child_rows:
+                    new_row = list(row)
+                    for position in null_positions:
+                        new_row[position] = None
+                    changed_rows.append((row_id, row, tuple(new_row)))
+                self.update_rows(child_metadata, changed_rows)
+
+        # rows referenced without an action block the delete
+        restricting_references = [
+            reference for reference in child_references if reference[3] == "no action"
+        ]
+        if restricting_references:
+            for _, row in rows:
+                child_table_name = self.find_referencing_table(
+                    restricting_references, row
+                )
+                if child_table_name is not None:
+                    return child_table_name
+
+        for row_id, row in rows:
+            self.delete_row(table_metadata, row_id, row)
+        return None
+
+    # foreign keys are kept under both of their tables, so either direction
+    # is a single lookup: fk_child:{table_name} lists the foreign keys of
+    # the table, fk_parent:{table_name} the foreign keys referencing it
+    def get_foreign_key_metadata(self, direction, table_name):
+        fk_metadata_serialized = self.db.get(
+            f"fk_{direction}:{table_name}".encode(), txn=self.txn
+        )
         if not fk_metadata_serialized:
             return []
         return pickle.loads(fk_metadata_serialized)
 
-    def put_foreign_key_metadata(self, fk_metadata_list):
-        self.db.put("foreign_key_metadata".encode(), pickle.dumps(fk_metadata_list))
-
-    def delete_foreign_key_metadata(self):
-        self.db.delete("foreign_key_metadata".encode())
+    def put_foreign_key_metadata(self, direction, table_name, fk_metadata_list):
+        key = f"fk_{direction}:{table_name}".encode()
+        if not fk_metadata_list:
+            if self.db.exists(key, txn=self.txn):
+                self.db.delete(key, txn=self.txn)
+            return
+        self.db.put(key, pickle.dumps(fk_metadata_list), txn=self.txn)
 
     def table_exists(self, table_name):
-        return self.db.get(f"table_schema:{table_name}".encode()) is not None
+        return (
+            self.db.get(f"table_schema:{table_name}".encode(), txn=self.txn) is not None
+        )
 
     # methods to implement DDL and DML
     def create_table(
@@ -146,8 +855,29 @@ class Database:
                 MessageHandler.print_error(MessageKeys.REFERENCE_NON_PRIMARY_KEY_ERROR)
                 return
 
+            # primary key columns become not null below
+            if fk["on_delete"] == "set null":
+                pk_columns = [
+                    col_name.lower()
+                    for pk in pk_constraints or []
+                    for col_name in pk["key_list"]
+                ]
+                for col in columns:
+                    col_name = col["name"].lower()
+                    if col_name in fk["key_list"] and (
+                        col["not_null"] or col_name in pk_columns
+                    ):
+                        MessageHandler.print_error(
+                            MessageKeys.REFERENCE_SET_NULL_ERROR, col_name=col_name
+                        )
+                        return
+
         table_metadata = TableMetadata(
-            table_name, columns, pk_constraints, fk_constraints
+            table_name,
+            columns,
+            pk_constraints,
+            fk_constraints,
+            table_id=self.allocate_id(storage.NEXT_TABLE_ID_KEY),
         )
 
         # set pk columns as not null
@@ -156,17 +886,39 @@ class Database:
                 if col_name.lower() in table_metadata.columns:
                     table_metadata.columns[col_name.lower()]["not_null"] = True
 
-        fk_metadata_list = self.get_foreign_key_metadata()
-        for fk in fk_constraints or []:
+        # every foreign key gets an index on its columns, so deleting a parent
+        # row finds referencing rows with a single probe. the name holds a
+        # digit, which user defined index names can not
+        fk_metadata_list = []
+        for i, fk in enumerate(table_metadata.fk_constraints):
+            fk["index_name"] = f"{table_name}_fk_{i + 1}"
+            table_metadata.indexes[fk["index_name"]] = IndexMetadata(
+                fk["index_name"],
+                table_name,
+                fk["key_list"],
+                self.allocate_id(storage.NEXT_INDEX_ID_KEY),
+            )
+            self.put_index_table_name(fk["index_name"], table_name)
             fk_metadata_list.append(
                 ForeignKeyMetadata(
-                    table_name, fk["key_list"], fk["ref_table"], fk["other_key_list"]
+                    table_name,
+                    fk["key_list"],
+                    fk["ref_table"],
+                    fk["other_key_list"],
+                    on_delete_action=fk["on_delete"],
+                    index_name=fk["index_name"],
                 )
             )
 
         self.put_table_metadata(table_name, table_metadata)
-        self.put_table_data(table_name, [])
-        self.put_foreign_key_metadata(fk_metadata_list)
+        self.put_foreign_key_metadata("child", table_name, fk_metadata_list)
+        for fk_metadata in fk_metadata_list:
+            parent_table_name = fk_metadata.referenced_parent_table
+            referencing_list = self.get_foreign_key_metadata(
+                "parent", parent_table_name
+            )
+            referencing_list.append(fk_metadata)
+            self.put_foreign_key_metadata("parent", parent_table_name, referencing_list)
 
         MessageHandler.print_success(
             MessageKeys.CREATE_TABLE_SUCCESS, table_name=table_name
@@ -181,24 +933,105 @@ class Database:
             )
             return
 
-        fk_metadata_list = self.get_foreign_key_metadata()
-        if any(fk.referenced_parent_table == table_name for fk in fk_metadata_list):
+        if self.get_foreign_key_metadata("parent", table_name):
             MessageHandler.print_error(
                 MessageKeys.DROP_REFERENCED_TABLE_ERROR, table_name=table_name
             )
             return
 
-        fk_metadata_list = [
-            fk for fk in fk_metadata_list if fk.child_table_name != table_name
-        ]
-
         # its own metadata and data, and regarded foreign key information should be deleted
-        self.put_foreign_key_metadata(fk_metadata_list)
+        table_metadata = self.get_table_metadata(table_name)
+        for fk in table_metadata.fk_constraints:
+            self.plan_cache.invalidate(fk["ref_table"].lower())
+        parent_table_names = {
+            fk_metadata.referenced_parent_table
+            for fk_metadata in self.get_foreign_key_metadata("child", table_name)
+        }
+        for parent_table_name in parent_table_names:
+            referencing_list = [
+                fk_metadata
+                for fk_metadata in self.get_foreign_key_metadata(
+                    "parent", parent_table_name
+                )
+                if fk_metadata.child_table_name != table_name
+            ]
+            self.put_foreign_key_metadata("parent", parent_table_name, referencing_list)
+        self.put_foreign_key_metadata("child", table_name, [])
+        self.delete_table_data(table_metadata)
+        for index_name in table_metadata.indexes:
+            self.delete_index_table_name(index_name)
         self.delete_table_metadata(table_name)
-        self.delete_table_data(table_name)
+        self.delete_table_statistics(table_name)
 
         MessageHandler.print_success(MessageKeys.DROP_SUCCESS, table_name=table_name)
 
+    def create_index(self, index_name: str, table_name: str, column_list: list):
+        index_name = index_name.lower()
+        table_name = table_name.lower()
+
+        table_metadata: TableMetadata = self.get_table_metadata(table_name)
+        if not table_metadata:
+            MessageHandler.print_error(
+                MessageKeys.NO_SUCH_TABLE, command_name="Create index"
+            )
+            return
+
+        if self.get_index_table_name(index_name) is not None:
+            MessageHandler.print_error(MessageKeys.INDEX_EXISTENCE_ERROR)
+            return
+
+        if len(column_list) != len(set(column_list)):
+            MessageHandler.print_error(MessageKeys.DUPLICATE_INDEX_COLUMN_ERROR)
+            return
+
+        for col_name in column_list:
+            if not table_metadata.get_column(col_name):
+                MessageHandler.print_error(
+                    MessageKeys.INDEX_COLUMN_DEF_ERROR, col_name=col_name
+                )
+                return
+
+        index_metadata = IndexMetadata(
+            index_name,
+            table_name,
+            column_list,
+            self.allocate_id(storage.NEXT_INDEX_ID_KEY),
+        )
+
+        # build the index from the rows already in the table
+        for row_id, row in self.scan_table_data(table_metadata):
+            self.db.put(
+                self.get_index_key(table_metadata, index_metadata, row, row_id),
+                b"",
+                txn=self.txn,
+            )
+
+        table_metadata.indexes[index_name] = index_metadata
+        self.put_table_metadata(table_name, table_metadata)
+        self.put_index_table_name(index_name, table_name)
+
+        MessageHandler.print_success(
+            MessageKeys.CREATE_INDEX_SUCCESS, index_name=index_name
+        )
+
+    def drop_index(self, index_name: str):
+        index_name = index_name.lower()
+
+        table_name = self.get_index_table_name(index_name)
+        if table_name is None:
+            MessageHandler.print_error(MessageKeys.NO_SUCH_INDEX)
+            return
+
+        table_metadata: TableMetadata = self.get_table_metadata(table_name)
+        index_metadata = table_metadata.indexes.pop(index_name)
+        self.delete_key_range(storage.index_prefix(index_metadata.index_id))
+        self.put_table_metadata(table_name, table_metadata)
+        self.delete_index_table_name(index_name)
+
+        MessageHandler.print_success(
+            MessageKeys.DROP_INDEX_SUCCESS, index_name=index_name
+        )
+
     def describe_table(self, table_name: str, command_name):
         table_name = table_name.lower()
 
@@ -235,35 +1068,49 @@ class Database:
         footer = Formatter.format_footer(len(rows))
         print("\n".join([table_str, footer]))
 
-    def show_tables(self):
-        # use berkeley db's cursor to look around entire key-value
-        cursor = self.db.cursor()
+    def get_table_names(self):
+        # schema keys are adjacent in the B-tree, so only they are visited
+        prefix = b"table_schema:"
+        cursor = self.db.cursor(self.txn)
         table_names = []
-        record = cursor.first()
-        while record:
-            key, _ = record
-
-            # filter by prefix
-            if key.decode().startswith("table_schema:"):
-                table_name = key.decode().split("table_schema:")[1]
-                table_names.append(table_name)
+        record = cursor.set_range(prefix)
+        while record and record[0].startswith(prefix):
+            table_names.append(record[0][len(prefix) :].decode())
             record = cursor.next()
         cursor.close()
+        return table_names
 
-        output = Formatter.format_table_list(table_names)
+    def show_tables(self):
+        output = Formatter.format_table_list(self.get_table_names())
         print(output)
 
+    # collect the statistics of a table, or of every table for None
+    def analyze_tables(self, table_name=None):
+        if table_name is None:
+            table_names = self.get_table_names()
+        else:
+            table_name = table_name.lower()
+            if not self.table_exists(table_name):
+                MessageHandler.print_error(
+                    MessageKeys.NO_SUCH_TABLE, command_name="Analyze"
+                )
+                return
+            table_names = [table_name]
+
+        for table_name in table_names:
+            table_metadata = self.get_table_metadata(table_name)
+            table_stats = collect_statistics(
+                table_metadata,
+                (row for _, row in self.scan_table_data(table_metadata)),
+            )
+            self.put_table_statistics(table_name, table_stats)
+
+        MessageHandler.print_success(MessageKeys.ANALYZE_RESULT, count=len(table_names))
+
+    # insert one row per list in values_list, all of them or none
     def insert_into_table(
-        self, table_name: str, values: list, column_sequence: list = None
+        self, table_name: str, values_list: list, column_sequence: list = None
     ):
-        # 에러처리
-        # case 1. column_sequence가 주어진 경우
-        # -> 컬럼과 값의 개수가 다른 경우 InsertTypeMismatchError
-        # -> 지정된 컬럼과 값의 타입이 맞지 않는 경우 InsertTypeMismatchError
-        # -> 칼럼에 명시되지 않은 값들은 null로 들어가는데, 이때 InsertColumnNonNullableError 처리
-
-        # case 2. column_sequence가 없는 경우
-        # -> 개수비교해서 다르면 InsertTypeMismatchError
         table_name = table_name.lower()
         table_metadata: TableMetadata = self.get_table_metadata(table_name)
         if not table_metadata:
@@ -272,9 +1119,52 @@ class Database:
             )
             return
 
+        try:
+            rows = []
+            # primary keys of the statement, which are not in the index yet
+            pk_keys = set()
+            parent_references = self.get_parent_references(table_metadata)
+            for values in values_list:
+                row = self.build_row(table_metadata, values, column_sequence)
+                if not self.parent_rows_exist(parent_references, row):
+                    raise InsertError(MessageKeys.INSERT_REFERENTIAL_INTEGRITY_ERROR)
+
+                # a single probe of the primary key index detects duplication
+                if table_metadata.pk_sets:
+                    pk_key = self.get_primary_key(table_metadata, row)
+                    if pk_key in pk_keys or self.db.exists(pk_key, txn=self.txn):
+                        raise InsertError(
+                            MessageKeys.INSERT_DUPLICATE_PRIMARY_KEY_ERROR
+                        )
+                    pk_keys.add(pk_key)
+                rows.append(row)
+        except InsertError as e:
+            MessageHandler.print_error(e.message_key, **e.kwargs)
+            return
+
+        if len(rows) == 1:
+            self.put_row(table_metadata, rows[0])
+            MessageHandler.print_success(MessageKeys.INSERT_RESULT)
+        else:
+            self.put_rows(table_metadata, rows)
+            MessageHandler.print_success(
+                MessageKeys.INSERT_ROWS_RESULT, count=len(rows)
+            )
+
+    # build the row tuple stored for values, raises InsertError
+    def build_row(
+        self, table_metadata: TableMetadata, values: list, column_sequence=None
+    ):
+        # 에러처리
+        # case 1. column_sequence가 주어진 경우
+        # -> 컬럼과 값의 개수가 다른 경우 InsertTypeMismatchError
+        # -> 지정된 컬럼과 값의 타입이 맞지 않는 경우 InsertTypeMismatchError
+        # -> 칼럼에 명시되지 않은 값들은 null로 들어가는데, 이때 InsertColumnNonNullableError 처리
+
+        # case 2. column_sequence가 없는 경우
+        # -> 개수비교해서 다르면 InsertTypeMismatchError
         columns_dict = table_metadata.columns
-        rows: list = self.get_table_data(table_name) or []
-        row = dict()
+        row = [None] * len(columns_dict)
 
         column_sequence_from_metadata = [columns_dict[i]["name"] for i in columns_dict]
 
@@ -284,83 +1174,152 @@ class Database:
 
         # check cardinality of values with columns
         if len(column_sequence) != len(values):
-            MessageHandler.print_error(MessageKeys.INSERT_TYPE_MISMATCH_ERROR)
-            return
+            raise InsertError(MessageKeys.INSERT_TYPE_MISMATCH_ERROR)
 
         for idx, col_name in enumerate(column_sequence):
             col = table_metadata.get_column(col_name)
             if not col:
-                MessageHandler.print_error(
+                raise InsertError(
                     MessageKeys.INSERT_COLUMN_EXISTENCE_ERROR, col_name=col_name
                 )
-                return
-            type_str: str = col["type"]
-            col_not_null: bool = col["not_null"]
+            position = table_metadata.get_column_position(col_name)
             value = values[idx]
-
-            # 타입체크를 해야함.
-            # case: value 값이 null인 경우와, 그렇지 않은 경우로 나눈다.
             if isinstance(value, str) and value.lower() == "null":
-                if col_not_null:
-                    MessageHandler.print_error(
-                        MessageKeys.INSERT_COLUMN_NON_NULLABLE_ERROR, col_name=col_name
-                    )
-                    return
-                # row[col_name] = "null"
-                row[f"{table_name}.{col_name}"] = None
-            else:
-                if type_str.startswith("char"):
-                    if not isinstance(value, str):
-                        MessageHandler.print_error(
-                            MessageKeys.INSERT_TYPE_MISMATCH_ERROR
-                        )
-                        return
+                value = None
 
-                    char_length = int(type_str[5:-1])
-                    # row[col_name] = value[:char_length].ljust(char_length)
-                    row[f"{table_name}.{col_name}"] = value[:char_length].ljust(
-                        char_length
-                    )
-                elif type_str == "date":
-                    try:
-                        parsed_date = datetime.datetime.strptime(value, "%Y-%m-%d")
-                        # row[col_name] = parsed_date.strftime("%Y-%m-%d")
-                        row[f"{table_name}.{col_name}"] = parsed_date
-                    except ValueError:
-                        MessageHandler.print_error(
-                            MessageKeys.INSERT_TYPE_MISMATCH_ERROR
-                        )
-                        return
-                else:
-                    if not isinstance(value, int):
-                        MessageHandler.print_error(
-                            MessageKeys.INSERT_TYPE_MISMATCH_ERROR
-                        )
-                        return
-                    # row[col_name] = value
-                    row[f"{table_name}.{col_name}"] = value
+            try:
+                row[position] = self.coerce_value(col, value)
+            except NonNullableError:
+                raise InsertError(
+                    MessageKeys.INSERT_COLUMN_NON_NULLABLE_ERROR, col_name=col_name
+                )
+            except TypeMismatchError:
+                raise InsertError(MessageKeys.INSERT_TYPE_MISMATCH_ERROR)
 
         for col_name in column_sequence_from_metadata:
             if col_name not in column_sequence:
                 col_meta = columns_dict[col_name]
                 if col_meta["not_null"]:
-                    MessageHandler.print_error(
+                    raise InsertError(
                         MessageKeys.INSERT_COLUMN_NON_NULLABLE_ERROR, col_name=col_name
                     )
-                    return
-                row[col_name] = None
-        rows.append(row)
-        self.put_table_data(table_name, rows)
-        MessageHandler.print_success(MessageKeys.INSERT_RESULT)
+        return tuple(row)
+
+    # value stored in the column for value, None is NULL
+    # raises NonNullableError or TypeMismatchError
+    def coerce_value(self, col, value):
+        type_str: str = col["type"]
+
+        # 타입체크를 해야함.
+        # case: value 값이 null인 경우와, 그렇지 않은 경우로 나눈다.
+        if value is None:
+            if col["not_null"]:
+                raise NonNullableError
+            return None
+
+        if type_str.startswith("char"):
+            if not isinstance(value, str):
+                raise TypeMismatchError
 
-    def select_from_table(
+            char_length = int(type_str[5:-1])
+            return value[:char_length].ljust(char_length)
+        elif type_str == "date":
+            if isinstance(value, datetime.datetime):
+                return value
+            try:
+                return datetime.datetime.strptime(value, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise TypeMismatchError
+        else:
+            if not isinstance(value, int):
+                raise TypeMismatchError
+            return value
+
+    # load the rows of a csv file, fields in the table's column order
+    # an empty field is NULL. the file is streamed and written in batches
+    # within the statement's transaction, which is rolled back if any row
+    # is rejected
+    def copy_into_table(self, table_name: str, file_name: str):
+        table_name = table_name.lower()
+        table_metadata: TableMetadata = self.get_table_metadata(table_name)
+        if not table_metadata:
+            MessageHandler.print_error(MessageKeys.NO_SUCH_TABLE, command_name="Copy")
+            return
+
+        int_positions = [
+            position
+            for position, column in enumerate(table_metadata.columns.values())
+            if column["type"] == "int"
+        ]
+        parent_references = self.get_parent_references(table_metadata)
+        copied_count = 0
+        reader = None
+        try:
+            with open(file_name, newline="") as file:
+                reader = csv.reader(file)
+                batch = []
+                # primary keys of the batch, which are not in the index yet
+                batch_keys = set()
+                for record in reader:
+                    values = [None if field == "" else field for field in record]
+                    for position in int_positions:
+                        if position < len(values) and values[position] is not None:
+                            try:
+                                values[position] = int(values[position])
+                            except ValueError:
+                                pass
+                    row = self.build_row(table_metadata, values)
+                    if not self.parent_rows_exist(parent_references, row):
+                        raise InsertError(
+                            MessageKeys.INSERT_REFERENTIAL_INTEGRITY_ERROR
+                        )
+
+                    if table_metadata.pk_sets:
+                        pk_key = self.get_primary_key(table_metadata, row)
+                        if pk_key in batch_keys or self.db.exists(pk_key, txn=self.txn):
+                            raise InsertError(
+                                MessageKeys.INSERT_DUPLICATE_PRIMARY_KEY_ERROR
+                            )
+                        batch_keys.add(pk_key)
+
+                    batch.append(row)
+                    if len(batch) == COPY_BATCH_SIZE:
+                        copied_count += self.put_rows(table_metadata, batch)
+                        batch = []
+                        batch_keys = set()
+                copied_count += self.put_rows(table_metadata, batch)
+        except (OSError, UnicodeDecodeError, csv.Error):
+            self.rollback_statement()
+            MessageHandler.print_error(MessageKeys.COPY_FILE_ERROR, file_name=file_name)
+            return
+        except InsertError:
+            self.rollback_statement()
+            MessageHandler.print_error(
+                MessageKeys.COPY_ROW_ERROR, line_number=reader.line_num
+            )
+            return
+
+        MessageHandler.print_success(MessageKeys.COPY_RESULT, count=copied_count)
+
+    def select_from_table(self, *select_args):
+        statement = self.prepare_select(*select_args)
+        if statement is not None:
+            statement.execute()
+        return statement
+
+    # bind and validate a SELECT, None if it fails
+    # select_list holds ColumnReference and Aggregate items
+    def prepare_select(
         self,
-        select_list: list[ColumnReference],
+        select_list: list,
         referred_tables: list[str],
         join_conditions: list[Condition],
         where_condition,
-        order_by_column: str,
-        order_by_direction: str,
+        group_by_columns: list[ColumnReference],
+        having_condition,
+        order_by_items: list,
+        limit: LiteralValue = None,
+        offset: LiteralValue = None,
     ):
         try:
             table_metadata_list = {
@@ -382,36 +1341,79 @@ class Database:
                         for col in metadata.columns.values()
                     )
 
-            table_dummy_data_row = {}
-            for table_meta in table_metadata_list.values():
-                table_dummy_data_row = {
-                    **table_dummy_data_row,
-                    **table_meta.get_dummy_row(),
-                }
-            # dummy를 활용해 select_list, join where condition을 검증
-            # todo: select_list는
+            # every column reference is resolved once here, against the schema.
+            # rows are only evaluated after the whole query is bound
+            binder = Binder(table_metadata_list)
+
+            # a query with GROUP BY, HAVING or aggregates is grouped: its select
+            # list, HAVING and ORDER BY are bound against the aggregated rows
+            group_binder = None
+            if (
+                group_by_columns
+                or having_condition is not None
+                or any(isinstance(i, Aggregate) for i in select_list)
+            ):
+                try:
+                    group_binder = GroupBinder(
+                        binder, [binder.bind(i) for i in group_by_columns]
+                    )
+                except TableNotSpecified:
+                    MessageHandler.print_error(
+                        MessageKeys.TABLE_NOT_SPECIFIED, clause_name="GROUP BY"
+                    )
+                    return
+                except ColumnNotFoundError:
+                    MessageHandler.print_error(
+                        MessageKeys.COLUMN_NOT_EXIST, clause_name="GROUP BY"
+                    )
+                    return
+                except AmbiguousReference:
+                    MessageHandler.print_error(
+                        MessageKeys.AMBIGUOUS_REFERENCE, clause_name="GROUP BY"
+                    )
+                    return
+            select_binder = group_binder or binder
+
+            select_columns = []
             for i in select_list:
+                # an aggregate fails on the column it aggregates
+                column_reference = i.column_reference if isinstance(i, Aggregate) else i
                 try:
-                    get_value(i, table_dummy_data_row, referred_tables)
+                    select_columns.append(select_binder.bind(i))
                 except TableNotSpecified:
                     MessageHandler.print_error(
-                        MessageKeys.SELECT_TABLE_EXISTENCE_ERROR, table_name=i.table
+                        MessageKeys.SELECT_TABLE_EXISTENCE_ERROR,
+                        table_name=column_reference.table,
                     )
                     return
                 except ColumnNotFoundError:
                     MessageHandler.print_error(
-                        MessageKeys.SELECT_COLUMN_RESOLVE_ERROR, col_name=i.column
+                        MessageKeys.SELECT_COLUMN_RESOLVE_ERROR,
+                        col_name=column_reference.column,
                     )
                     return
                 except AmbiguousReference:
                     MessageHandler.print_error(
-                        MessageKeys.SELECT_COLUMN_RESOLVE_ERROR, col_name=i.column
+                        MessageKeys.SELECT_COLUMN_RESOLVE_ERROR,
+                        col_name=column_reference.column,
+                    )
+                    return
+                except ColumnNotGrouped as e:
+                    MessageHandler.print_error(
+                        MessageKeys.SELECT_COLUMN_NOT_GROUPED, col_name=e.column_name
+                    )
+                    return
+                except AggregateTypeError as e:
+                    MessageHandler.print_error(
+                        MessageKeys.SELECT_AGGREGATE_TYPE_ERROR,
+                        function_name=e.function_name,
+                        col_name=e.column_name,
                     )
                     return
 
             try:
                 for i in join_conditions:
-                    evaluate_condition(i, table_dummy_data_row, referred_tables)
+                    compile_condition(i, binder)
             except TableNotSpecified:
                 MessageHandler.print_error(
                     MessageKeys.TABLE_NOT_SPECIFIED, clause_name="JOIN"
@@ -429,9 +1431,19 @@ class Database:
                 return
 
             try:
-                evaluate_condition(
-                    where_condition, table_dummy_data_row, referred_tables
-                )
+                if where_condition is not None:
+                    compile_condition(where_condition, binder)
+
+                # split WHERE into AND-conjuncts, a conjunct referencing a single
+                # table is evaluated while scanning that table, before the join
+                pushed_conditions = {table_name: [] for table_name in referred_tables}
+                residual_conditions = []
+                for conjunct in split_conjuncts(where_condition):
+                    conjunct_tables = get_referenced_tables(conjunct, binder)
+                    if len(conjunct_tables) == 1:
+                        pushed_conditions[conjunct_tables.pop()].append(conjunct)
+                    else:
+                        residual_conditions.append(conjunct)
             except TableNotSpecified:
                 MessageHandler.print_error(
                     MessageKeys.TABLE_NOT_SPECIFIED, clause_name="WHERE"
@@ -447,86 +1459,49 @@ class Database:
                     MessageKeys.AMBIGUOUS_REFERENCE, clause_name="WHERE"
                 )
                 return
-
-            table_data_list = {
-                table_name: self.get_table_data(table_name.lower())
-                for table_name in referred_tables
-            }
-
-            rows = table_data_list[referred_tables[0]]
-            if len(referred_tables) > 1:
-                rows = [
-                    {key: value for row in combined_row for key, value in row.items()}
-                    for combined_row in product(*table_data_list.values())
-                ]
+            except AggregateNotAllowed:
+                MessageHandler.print_error(
+                    MessageKeys.AGGREGATE_NOT_ALLOWED, clause_name="WHERE"
+                )
+                return
 
             try:
-                # join
-                if not join_conditions:
-                    new_rows = []
-                    for row in rows:
-                        result = [
-                            evaluate_condition(con, row, referred_tables)
-                            for con in join_conditions
-                        ]
-                        if all(result):
-                            new_rows.append(row)
-                    rows = new_rows
+                if having_condition is not None:
+                    compile_condition(having_condition, group_binder)
             except TableNotSpecified:
                 MessageHandler.print_error(
-                    MessageKeys.TABLE_NOT_SPECIFIED, clause_name="JOIN"
+                    MessageKeys.TABLE_NOT_SPECIFIED, clause_name="HAVING"
                 )
                 return
             except ColumnNotFoundError:
                 MessageHandler.print_error(
-                    MessageKeys.COLUMN_NOT_EXIST, clause_name="JOIN"
+                    MessageKeys.COLUMN_NOT_EXIST, clause_name="HAVING"
                 )
                 return
             except AmbiguousReference:
                 MessageHandler.print_error(
-                    MessageKeys.AMBIGUOUS_REFERENCE, clause_name="JOIN"
-                )
-                return
-
-            try:
-                if where_condition is not None:
-                    new_rows = []
-                    for row in rows:
-                        if evaluate_condition(where_condition, row, referred_tables):
-                            new_rows.append(row)
-                    rows = new_rows
-            except TableNotSpecified:
-                MessageHandler.print_error(
-                    MessageKeys.TABLE_NOT_SPECIFIED, clause_name="WHERE"
+                    MessageKeys.AMBIGUOUS_REFERENCE, clause_name="HAVING"
                 )
                 return
-            except ColumnNotFoundError:
+            except ColumnNotGrouped as e:
                 MessageHandler.print_error(
-                    MessageKeys.COLUMN_NOT_EXIST, clause_name="WHERE"
+                    MessageKeys.SELECT_COLUMN_NOT_GROUPED, col_name=e.column_name
                 )
                 return
-            except AmbiguousReference:
+            except AggregateTypeError as e:
                 MessageHandler.print_error(
-                    MessageKeys.AMBIGUOUS_REFERENCE, clause_name="WHERE"
+                    MessageKeys.SELECT_AGGREGATE_TYPE_ERROR,
+                    function_name=e.function_name,
+                    col_name=e.column_name,
                 )
                 return
 
             try:
-                if order_by_column is not None:
-                    # column 유효성 검증
-                    get_value(
-                        ColumnReference(None, order_by_column),
-                        table_dummy_data_row,
-                        referred_tables,
-                    )
-                    rows.sort(
-                        key=lambda row: get_value(
-                            ColumnReference(None, order_by_column),
-                            row,
-                            referred_tables,
-                        ),
-                        reverse=(order_by_direction == "desc"),
-                    )
+                # (row key, descending) per sort key
+                sort_keys = [
+                    (select_binder.bind(column_reference).key, direction == "desc")
+                    for column_reference, direction in order_by_items
+                ]
             except TableNotSpecified:
                 MessageHandler.print_error(
                     MessageKeys.TABLE_NOT_SPECIFIED, clause_name="ORDER BY"
@@ -542,68 +1517,478 @@ class Database:
                     MessageKeys.AMBIGUOUS_REFERENCE, clause_name="ORDER BY"
                 )
                 return
-            # Formatting table to display
-            table_str = Formatter.format_table_select(
-                select_list, rows, referred_tables
-            )
-            footer = Formatter.format_footer(len(rows))
-            print("\n".join([table_str, footer]))
+            except ColumnNotGrouped as e:
+                MessageHandler.print_error(
+                    MessageKeys.SELECT_COLUMN_NOT_GROUPED, col_name=e.column_name
+                )
+                return
 
         except IncomparableTypeError:
             MessageHandler.print_error(MessageKeys.INCOMPARABLE_ERROR)
+            return
 
-    def delete_from_table(self, table_name: str, condition):
+        statement = PreparedStatement(
+            referred_tables,
+            collect_literals(where_condition)
+            + collect_literals(having_condition)
+            + [literal for literal in (limit, offset) if literal is not None],
+            self.execute_select,
+            select_list,
+            referred_tables,
+            table_metadata_list,
+            binder,
+            select_columns,
+            join_conditions,
+            pushed_conditions,
+            residual_conditions,
+            group_binder,
+            having_condition,
+            sort_keys,
+            limit,
+            offset,
+        )
+        return statement
+
+    # run a bound SELECT with the current values of its literals
+    def execute_select(self, select_list, *plan_args):
+        plan = self.build_select_plan(*plan_args)
+        if plan is None:
+            return
+
+        # Formatting table to display
+        # the projected rows are buffered, column widths depend on every row
+        rows = list(plan)
+        table_str = Formatter.format_table_select(select_list, rows)
+        footer = Formatter.format_footer(len(rows))
+        print("\n".join([table_str, footer]))
+
+    # print the operator tree of a SELECT; ANALYZE also runs it and reports
+    # what each operator did, discarding the result rows
+    def explain_select(self, analyze, *select_args):
+        statement = self.prepare_select(*select_args)
+        if statement is None:
+            return
+        _, *plan_args = statement.args
+        plan = self.build_select_plan(*plan_args)
+        if plan is None:
+            return
+
+        if not analyze:
+            rows = [
+                ["  " * depth + operator.describe()]
+                for depth, operator in walk_plan(plan)
+            ]
+            print(Formatter.format_table(["plan"], rows))
+            return
+
+        plan = analyze_plan(plan)
+        # tracing slows allocations down, times are relative to each other
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            for _ in plan:
+                pass
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        # operators are described after running, some report what they did
+        rows = [
+            [
+                "  " * depth + operator.describe(),
+                operator.rows,
+                operator.loops,
+                f"{operator.time * 1000:.3f}",
+                Formatter.format_size(operator.peak_memory),
+            ]
+            for depth, operator in walk_plan(plan)
+        ]
+        print(
+            Formatter.format_table(
+                ["plan", "rows", "loops", "time_ms", "peak_memory"], rows
+            )
+        )
+
+    # operator tree of a bound SELECT, None if its LIMIT or OFFSET is invalid
+    def build_select_plan(
+        self,
+        referred_tables,
+        table_metadata_list,
+        binder,
+        select_columns,
+        join_conditions,
+        pushed_conditions,
+        residual_conditions,
+        group_binder,
+        having_condition,
+        sort_keys,
+        limit,
+        offset,
+    ):
+        offset_count = 0 if offset is None else offset.value
+        if limit is not None and (limit.value < 0 or offset_count < 0):
+            MessageHandler.print_error(MessageKeys.SELECT_LIMIT_ERROR)
+            return
+
+        # build the operator tree, rows are pulled through it lazily up to
+        # the projection, whose rows execute_select buffers so the formatter
+        # can compute the column widths
+        table_scans = {}
+        for table_name in referred_tables:
+            table_condition = combine_conjuncts(pushed_conditions[table_name])
+            table_scans[table_name] = Scan(
+                self, table_metadata_list[table_name], table_condition
+            )
+            if table_condition is not None:
+                # rows are not joined yet, bind against this table alone
+                table_scans[table_name] = Filter(
+                    table_scans[table_name],
+                    compile_condition(
+                        table_condition,
+                        Binder({table_name: table_metadata_list[table_name]}),
+                    ),
+                    table_condition,
+                )
+
+        plan = self.build_join_plan(
+            referred_tables, binder, table_scans, join_conditions
+        )
+
+        where_condition = combine_conjuncts(residual_conditions)
+        if where_condition is not None:
+            plan = Filter(
+                plan, compile_condition(where_condition, binder), where_condition
+            )
+
+        if group_binder is not None:
+            plan = HashAggregate(
+                plan,
+                [column.key for column in group_binder.group_columns],
+                group_binder.aggregates,
+            )
+            if having_condition is not None:
+                plan = Filter(
+                    plan,
+                    compile_condition(having_condition, group_binder),
+                    having_condition,
+                )
+
+        # only the first offset + limit rows of an ordered result are kept
+        if sort_keys and limit is not None:
+            plan = TopK(plan, sort_keys, offset_count + limit.value)
+        elif sort_keys:
+            plan = Sort(plan, sort_keys, self.sort_memory_budget)
+        if limit is not None:
+            plan = Limit(plan, limit.value, offset_count)
+
+        return Project(plan, [column.key for column in select_columns])
+
+    # join the referred tables left to right
+    # each step hash joins on the equality conditions linking the new table
+    # to the tables joined so far; other conditions filter the joined rows
+    def build_join_plan(self, referred_tables, binder, table_scans, join_conditions):
+        plan = table_scans[referred_tables[0]]
+        joined_tables = {referred_tables[0]}
+        pending_conditions = list(join_conditions)
+
+        for table_name in referred_tables[1:]:
+            left_keys = []
+            right_keys = []
+            key_conditions = []
+            for condition in list(pending_conditions):
+                if not (
+                    isinstance(condition.left_operand, ColumnReference)
+                    and isinstance(condition.right_operand, ColumnReference)
+                    and condition.operator == "="
+                ):
+                    continue
+                left_column = binder.bind(condition.left_operand)
+                right_column = binder.bind(condition.right_operand)
+                # the new table's rows are not joined yet, so its columns are
+                # addressed relative to the table's own row tuple
+                table_offset = binder.table_offsets[table_name]
+                if (
+                    left_column.table_name in joined_tables
+                    and right_column.table_name == table_name
+                ):
+                    left_keys.append(left_column.key)
+                    right_keys.append(right_column.key - table_offset)
+                elif (
+                    right_column.table_name in joined_tables
+                    and left_column.table_name == table_name
+                ):
+                    left_keys.append(right_column.key)
+                    right_keys.append(left_column.key - table_offset)
+                else:
+                    continue
+                pending_conditions.remove(condition)
+                key_conditions.append(condition)
+
+            if left_keys:
+                plan = HashJoin(
+                    plan,
+                    table_scans[table_name],
+                    make_join_key(left_keys),
+                    make_join_key(right_keys),
+                    key_conditions,
+                )
+            else:
+                plan = CrossJoin(plan, table_scans[table_name])
+            joined_tables.add(table_name)
+
+        if pending_conditions:
+            join_condition = combine_conjuncts(pending_conditions)
+            plan = Filter(
+                plan, compile_condition(join_condition, binder), join_condition
+            )
+        return plan
+
+    # assignments: list of (column name, LiteralValue or None for NULL)
+    def update_table(self, table_name: str, assignments: list, condition):
         try:
             table_name = table_name.lower()
             table_metadata: TableMetadata = self.get_table_metadata(table_name)
             if not table_metadata:
                 MessageHandler.print_error(
-                    MessageKeys.NO_SUCH_TABLE, command_name="Delete from"
+                    MessageKeys.NO_SUCH_TABLE, command_name="Update"
                 )
                 return
 
-            rows = self.get_table_data(table_name) or []
+            for col_name, _ in assignments:
+                if not table_metadata.get_column(col_name):
+                    MessageHandler.print_error(
+                        MessageKeys.UPDATE_COLUMN_EXISTENCE_ERROR, col_name=col_name
+                    )
+                    return
+
+            binder = Binder({table_name: table_metadata})
+            if condition is not None:
+                compile_condition(condition, binder)
 
-            # If condition is None, delete all rows
-            if condition is None:
-                deleted_count = len(rows)
-                rows = []
-            else:
-                # Use dummy row in metadata to check incomparability when table is empty
-                evaluate_condition(
-                    condition, table_metadata.get_dummy_row(), [table_name]
+        except ColumnNotFoundError:
+            MessageHandler.print_error(
+                MessageKeys.COLUMN_NOT_EXIST, clause_name="WHERE"
+            )
+            return
+        except IncomparableTypeError:
+            MessageHandler.print_error(MessageKeys.INCOMPARABLE_ERROR)
+            return
+        except TableNotSpecified:
+            MessageHandler.print_error(
+                MessageKeys.TABLE_NOT_SPECIFIED, clause_name="WHERE"
+            )
+            return
+        except AmbiguousReference:
+            MessageHandler.print_error(
+                MessageKeys.AMBIGUOUS_REFERENCE, clause_name="WHERE"
+            )
+            return
+        except AggregateNotAllowed:
+            MessageHandler.print_error(
+                MessageKeys.AGGREGATE_NOT_ALLOWED, clause_name="WHERE"
+            )
+            return
+
+        statement = PreparedStatement(
+            [table_name],
+            [value for _, value in assignments if value is not None]
+            + collect_literals(condition),
+            self.execute_update,
+            table_metadata,
+            binder,
+            assignments,
+            condition,
+            self.get_parent_references(table_metadata),
+            self.get_child_references(table_metadata),
+        )
+        statement.execute()
+        return statement
+
+    # run a bound UPDATE with the current values of its literals
+    # rows keep their row id, only the index entries of changed keys move
+    def execute_update(
+        self,
+        table_metadata: TableMetadata,
+        binder,
+        assignments,
+        condition,
+        parent_references,
+        child_references,
+    ):
+        new_values = {}
+        for col_name, literal in assignments:
+            try:
+                new_values[table_metadata.get_column_position(col_name)] = (
+                    self.coerce_value(
+                        table_metadata.get_column(col_name),
+                        None if literal is None else literal.value,
+                    )
+                )
+            except NonNullableError:
+                MessageHandler.print_error(
+                    MessageKeys.UPDATE_COLUMN_NON_NULLABLE_ERROR, col_name=col_name
                 )
+                return
+            except TypeMismatchError:
+                MessageHandler.print_error(MessageKeys.UPDATE_TYPE_MISMATCH_ERROR)
+                return
 
-                # Delete rows that satisfy the condition
-                new_rows = []
-                deleted_count = 0
-                for row in rows:
-                    if not evaluate_condition(condition, row, [table_name]):
-                        new_rows.append(row)
-                    else:
-                        deleted_count += 1
-                rows = new_rows
+        rows = self.scan_table_candidates(table_metadata, condition)
+        if condition is not None:
+            predicate = compile_condition(condition, binder)
+            rows = (item for item in rows if predicate(item[1]))
+
+        updated_rows = []
+        for row_id, row in rows:
+            new_row = list(row)
+            for position, value in new_values.items():
+                new_row[position] = value
+            updated_rows.append((row_id, row, tuple(new_row)))
+
+        if table_metadata.pk_sets and any(
+            table_metadata.get_column_position(col) in new_values
+            for col in table_metadata.pk_sets
+        ):
+            old_keys = set()
+            new_keys = set()
+            for _, row, new_row in updated_rows:
+                old_keys.add(self.get_primary_key(table_metadata, row))
+                new_key = self.get_primary_key(table_metadata, new_row)
+                if new_key in new_keys:
+                    MessageHandler.print_error(
+                        MessageKeys.UPDATE_DUPLICATE_PRIMARY_KEY_ERROR
+                    )
+                    return
+                new_keys.add(new_key)
+            # keys left by updated rows are free, other existing keys are not
+            for new_key in new_keys - old_keys:
+                if self.db.exists(new_key, txn=self.txn):
+                    MessageHandler.print_error(
+                        MessageKeys.UPDATE_DUPLICATE_PRIMARY_KEY_ERROR
+                    )
+                    return
 
-            # Update table with new rows
-            self.put_table_data(table_name, rows)
+        changed_rows = [item for item in updated_rows if item[1] != item[2]]
+
+        # only references whose columns change can be broken
+        parent_references = [
+            (parent_table_id, positions)
+            for parent_table_id, positions in parent_references
+            if any(position in new_values for position in positions)
+        ]
+        child_references = [
+            reference
+            for reference in child_references
+            if any(position in new_values for position in reference[2])
+        ]
+        for _, row, new_row in changed_rows:
+            if not self.parent_rows_exist(parent_references, new_row):
+                MessageHandler.print_error(
+                    MessageKeys.UPDATE_REFERENTIAL_INTEGRITY_ERROR
+                )
+                return
+            if self.find_referencing_table(child_references, row) is not None:
+                MessageHandler.print_error(
+                    MessageKeys.UPDATE_REFERENTIAL_INTEGRITY_ERROR
+                )
+                return
+
+        self.update_rows(table_metadata, changed_rows)
+        MessageHandler.print_success(MessageKeys.UPDATE_RESULT, count=len(updated_rows))
+
+    def delete_from_table(self, table_name: str, condition):
+        try:
+            table_name = table_name.lower()
+            table_metadata: TableMetadata = self.get_table_metadata(table_name)
+            if not table_metadata:
+                MessageHandler.print_error(
+                    MessageKeys.NO_SUCH_TABLE, command_name="Delete from"
+                )
+                return
 
-            # Success message with correct count handling
-            MessageHandler.print_success(MessageKeys.DELETE_RESULT, count=deleted_count)
+            binder = Binder({table_name: table_metadata})
+            if condition is not None:
+                # binding checks references and incomparability even when table is empty
+                compile_condition(condition, binder)
 
         except ColumnNotFoundError:
             MessageHandler.print_error(
                 MessageKeys.COLUMN_NOT_EXIST, clause_name="WHERE"
             )
+            return
         except IncomparableTypeError:
             MessageHandler.print_error(MessageKeys.INCOMPARABLE_ERROR)
+            return
         except TableNotSpecified:
             MessageHandler.print_error(
                 MessageKeys.TABLE_NOT_SPECIFIED, clause_name="WHERE"
             )
+            return
         except AmbiguousReference:
             MessageHandler.print_error(
                 MessageKeys.AMBIGUOUS_REFERENCE, clause_name="WHERE"
             )
+            return
+        except AggregateNotAllowed:
+            MessageHandler.print_error(
+                MessageKeys.AGGREGATE_NOT_ALLOWED, clause_name="WHERE"
+            )
+            return
+
+        statement = PreparedStatement(
+            [table_name],
+            collect_literals(condition),
+            self.execute_delete,
+            table_metadata,
+            binder,
+            condition,
+            self.get_child_references(table_metadata),
+        )
+        statement.execute()
+        return statement
+
+    # run a bound DELETE with the current values of its literals
+    def execute_delete(
+        self, table_metadata: TableMetadata, binder, condition, child_references
+    ):
+        # If condition is None and no table references this one, delete all rows
+        if condition is None and not child_references:
+            deleted_count = self.delete_table_data(table_metadata)
+        else:
+            rows = self.scan_table_candidates(table_metadata, condition)
+            if condition is not None:
+                predicate = compile_condition(condition, binder)
+                rows = (item for item in rows if predicate(item[1]))
+
+            # Delete rows that satisfy the condition, one key at a time
+            deleted_rows = list(rows)
+
+            # nothing is deleted if any of the rows is still referenced
+            child_table_name = self.delete_rows(
+                table_metadata, deleted_rows, child_references
+            )
+            if child_table_name is not None:
+                self.rollback_statement()
+                MessageHandler.print_error(
+                    MessageKeys.DELETE_REFERENCED_ROW_ERROR,
+                    table_name=child_table_name,
+                )
+                return
+            deleted_count = len(deleted_rows)
+
+        # Success message with correct count handling
+        MessageHandler.print_success(MessageKeys.DELETE_RESULT, count=deleted_count)
 
+    # a transaction still open on exit is rolled back
     def close(self):
+        if self.txn is not None:
+            self.txn.abort()
+            self.txn = None
+        if self.transaction is not None:
+            self.transaction.abort()
+            self.transaction = None
+        self.env.log_flush()
+        self.env.txn_checkpoint()
         self.db.close()
+        self.env.close()
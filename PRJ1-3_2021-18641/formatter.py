@@ -2,21 +2,20 @@
 
 
 import datetime
-from utils import get_value
 
 
 class Formatter:
     @staticmethod
-    def format_table_select(headers_col_refs, rows, referred_tables):
+    def format_table_select(headers_col_refs, rows):
+        # rows are already projected, holding the selected values in header order
         # calculate width as max width of whole header and rows.
         # set each col_width as max width of column(header or any rows)
         # for appearance, set minimum total width as 15
 
-        headers = [i.column if i.table is None else str(i) for i in headers_col_refs]
+        headers = [str(i) for i in headers_col_refs]
         col_widths = [len(header) for header in headers]
         for row in rows:
-            for idx, header in enumerate(headers_col_refs):
-                cell = get_value(header, row, referred_tables)
+            for idx, cell in enumerate(row):
 
                 col_widths[idx] = max(col_widths[idx], len(str(cell)))
 
@@ -45,16 +44,11 @@ class Formatter:
                 format_str.format(
                     *[
                         (
-                            str(get_value(header, row, referred_tables))
-                            if not isinstance(
-                                get_value(header, row, referred_tables),
-                                datetime.datetime,
-                            )
-                            else get_value(header, row, referred_tables).strftime(
-                                "%Y-%m-%d"
-                            )
+                            str(cell)
+                            if not isinstance(cell, datetime.datetime)
+                            else cell.strftime("%Y-%m-%d")
                         )
-                        for header in headers_col_refs
+                        for cell in row
                     ]
                 )
                 for row in rows
@@ -106,6 +100,17 @@ class Formatter:
 
         return table
 
+    @staticmethod
+    def format_size(size):
+        # bytes in the largest unit keeping the number at least 1
+        if abs(size) < 1024:
+            return f"{size} B"
+        for unit in ("KiB", "MiB"):
+            size /= 1024
+            if abs(size) < 1024:
+                return f"{size:.1f} {unit}"
+        return f"{size / 1024:.1f} GiB"
+
     @staticmethod
     def format_footer(row_count):
         # handle row/rows according to even and odd.
@@ -8,6 +8,7 @@ class MessageKeys:
     REFERENCE_TYPE_ERROR = "ReferenceTypeError"
     REFERENCE_NON_PRIMARY_KEY_ERROR = "ReferenceNonPrimaryKeyError"
     REFERENCE_EXISTENCE_ERROR = "ReferenceExistenceError"
+    REFERENCE_SET_NULL_ERROR = "ReferenceSetNullError"
     PRIMARY_KEY_COLUMN_DEF_ERROR = "PrimaryKeyColumnDefError"
     FOREIGN_KEY_COLUMN_DEF_ERROR = "ForeignKeyColumnDefError"
     TABLE_EXISTENCE_ERROR = "TableExistenceError"
@@ -18,16 +19,44 @@ class MessageKeys:
     CREATE_TABLE_SUCCESS = "CreateTableSuccess"
     DROP_SUCCESS = "DropSuccess"
     INSERT_RESULT = "InsertResult"
+    INSERT_ROWS_RESULT = "InsertRowsResult"
     INSERT_TYPE_MISMATCH_ERROR = "InsertTypeMismatchError"
     INSERT_COLUMN_EXISTENCE_ERROR = "InsertColumnExistenceError"
     INSERT_COLUMN_NON_NULLABLE_ERROR = "InsertColumnNonNullableError"
+    INSERT_DUPLICATE_PRIMARY_KEY_ERROR = "InsertDuplicatePrimaryKeyError"
+    INSERT_REFERENTIAL_INTEGRITY_ERROR = "InsertReferentialIntegrityError"
     DELETE_RESULT = "DeleteResult"
+    DELETE_REFERENCED_ROW_ERROR = "DeleteReferencedRowError"
+    UPDATE_RESULT = "UpdateResult"
+    UPDATE_TYPE_MISMATCH_ERROR = "UpdateTypeMismatchError"
+    UPDATE_COLUMN_EXISTENCE_ERROR = "UpdateColumnExistenceError"
+    UPDATE_COLUMN_NON_NULLABLE_ERROR = "UpdateColumnNonNullableError"
+    UPDATE_DUPLICATE_PRIMARY_KEY_ERROR = "UpdateDuplicatePrimaryKeyError"
+    UPDATE_REFERENTIAL_INTEGRITY_ERROR = "UpdateReferentialIntegrityError"
     SELECT_COLUMN_RESOLVE_ERROR = "SelectColumnResolveError"
     SELECT_COLUMN_NOT_GROUPED = "SelectColumnNotGrouped"
+    SELECT_AGGREGATE_TYPE_ERROR = "SelectAggregateTypeError"
+    AGGREGATE_NOT_ALLOWED = "AggregateNotAllowed"
+    SELECT_LIMIT_ERROR = "SelectLimitError"
     TABLE_NOT_SPECIFIED = "TableNotSpecified"
     COLUMN_NOT_EXIST = "ColumnNotExist"
     AMBIGUOUS_REFERENCE = "AmbiguousReference"
     INCOMPARABLE_ERROR = "IncomparableError"
+    CREATE_INDEX_SUCCESS = "CreateIndexSuccess"
+    DROP_INDEX_SUCCESS = "DropIndexSuccess"
+    INDEX_EXISTENCE_ERROR = "IndexExistenceError"
+    INDEX_COLUMN_DEF_ERROR = "IndexColumnDefError"
+    DUPLICATE_INDEX_COLUMN_ERROR = "DuplicateIndexColumnError"
+    NO_SUCH_INDEX = "NoSuchIndex"
+    COPY_RESULT = "CopyResult"
+    ANALYZE_RESULT = "AnalyzeResult"
+    COPY_FILE_ERROR = "CopyFileError"
+    COPY_ROW_ERROR = "CopyRowError"
+    BEGIN_SUCCESS = "BeginSuccess"
+    COMMIT_SUCCESS = "CommitSuccess"
+    ROLLBACK_SUCCESS = "RollbackSuccess"
+    TRANSACTION_IN_PROGRESS_ERROR = "TransactionInProgressError"
+    NO_TRANSACTION_ERROR = "NoTransactionError"
 
 
 class MessageValues:
@@ -43,6 +72,7 @@ class MessageValues:
     )
     REFERENCE_NON_PRIMARY_KEY_ERROR = "DB_2021-18641> Create table has failed: foreign key references non primary key column"
     REFERENCE_EXISTENCE_ERROR = "DB_2021-18641> Create table has failed: foreign key references non existing table or column"
+    REFERENCE_SET_NULL_ERROR = "DB_2021-18641> Create table has failed: cannot set non-nullable column '{col_name}' to null on delete"
     PRIMARY_KEY_COLUMN_DEF_ERROR = "DB_2021-18641> Create table has failed: cannot define non-existing column '{col_name}' as primary key"
     FOREIGN_KEY_COLUMN_DEF_ERROR = "DB_2021-18641> Create table has failed: cannot define non-existing column '{col_name}' as foreign key"
     TABLE_EXISTENCE_ERROR = "DB_2021-18641> Create table has failed: table with the same name already exists"
@@ -55,6 +85,7 @@ class MessageValues:
     CREATE_TABLE_SUCCESS = "DB_2021-18641> {table_name} table is created"
     DROP_SUCCESS = "DB_2021-18641> {table_name} table is dropped"
     INSERT_RESULT = "DB_2021-18641> 1 row inserted"
+    INSERT_ROWS_RESULT = "DB_2021-18641> {count} rows inserted"
     INSERT_TYPE_MISMATCH_ERROR = (
         "DB_2021-18641> Insert has failed: types are not matched"
     )
@@ -64,11 +95,43 @@ class MessageValues:
     INSERT_COLUMN_NON_NULLABLE_ERROR = (
         "DB_2021-18641> Insert has failed: '{col_name}' is not nullable"
     )
+    INSERT_DUPLICATE_PRIMARY_KEY_ERROR = (
+        "DB_2021-18641> Insert has failed: primary key duplication"
+    )
+    INSERT_REFERENTIAL_INTEGRITY_ERROR = (
+        "DB_2021-18641> Insert has failed: referential integrity violation"
+    )
     DELETE_RESULT = "DB_2021-18641> {count} row(s) deleted"
+    DELETE_REFERENCED_ROW_ERROR = (
+        "DB_2021-18641> Delete has failed: rows are referenced by '{table_name}'"
+    )
+    UPDATE_RESULT = "DB_2021-18641> {count} row(s) updated"
+    UPDATE_TYPE_MISMATCH_ERROR = (
+        "DB_2021-18641> Update has failed: types are not matched"
+    )
+    UPDATE_COLUMN_EXISTENCE_ERROR = (
+        "DB_2021-18641> Update has failed: '{col_name}' does not exist"
+    )
+    UPDATE_COLUMN_NON_NULLABLE_ERROR = (
+        "DB_2021-18641> Update has failed: '{col_name}' is not nullable"
+    )
+    UPDATE_DUPLICATE_PRIMARY_KEY_ERROR = (
+        "DB_2021-18641> Update has failed: primary key duplication"
+    )
+    UPDATE_REFERENTIAL_INTEGRITY_ERROR = (
+        "DB_2021-18641> Update has failed: referential integrity violation"
+    )
     SELECT_COLUMN_RESOLVE_ERROR = (
         "DB_2021-18641> Select has failed: fail to resolve '{col_name}'"
     )
     SELECT_COLUMN_NOT_GROUPED = "DB_2021-18641> Select has failed: column '{col_name}' must either be included in the GROUP BY clause or be used in an aggregate function"
+    SELECT_AGGREGATE_TYPE_ERROR = "DB_2021-18641> Select has failed: cannot apply {function_name} to non-numeric column '{col_name}'"
+    AGGREGATE_NOT_ALLOWED = (
+        "DB_2021-18641> {clause_name} clause cannot contain aggregate functions"
+    )
+    SELECT_LIMIT_ERROR = (
+        "DB_2021-18641> Select has failed: LIMIT and OFFSET cannot be negative"
+    )
     TABLE_NOT_SPECIFIED = "DB_2021-18641> {clause_name} clause trying to reference tables which are not specified"
     COLUMN_NOT_EXIST = (
         "DB_2021-18641> {clause_name} clause trying to reference non existing column"
@@ -79,6 +142,28 @@ class MessageValues:
     INCOMPARABLE_ERROR = (
         "DB_2021-18641> Trying to compare incomparable columns or values"
     )
+    CREATE_INDEX_SUCCESS = "DB_2021-18641> {index_name} index is created"
+    DROP_INDEX_SUCCESS = "DB_2021-18641> {index_name} index is dropped"
+    INDEX_EXISTENCE_ERROR = "DB_2021-18641> Create index has failed: index with the same name already exists"
+    INDEX_COLUMN_DEF_ERROR = "DB_2021-18641> Create index has failed: cannot define index on non-existing column '{col_name}'"
+    DUPLICATE_INDEX_COLUMN_ERROR = (
+        "DB_2021-18641> Create index has failed: column is duplicated"
+    )
+    NO_SUCH_INDEX = "DB_2021-18641> Drop index has failed: no such index"
+    COPY_RESULT = "DB_2021-18641> {count} row(s) copied"
+    COPY_FILE_ERROR = "DB_2021-18641> Copy has failed: cannot read '{file_name}'"
+    COPY_ROW_ERROR = "DB_2021-18641> Copy has failed: invalid row at line {line_number}"
+    ANALYZE_RESULT = "DB_2021-18641> {count} table(s) analyzed"
+
+    BEGIN_SUCCESS = "DB_2021-18641> Transaction started"
+    COMMIT_SUCCESS = "DB_2021-18641> Transaction committed"
+    ROLLBACK_SUCCESS = "DB_2021-18641> Transaction rolled back"
+    TRANSACTION_IN_PROGRESS_ERROR = (
+        "DB_2021-18641> Begin has failed: a transaction is already in progress"
+    )
+    NO_TRANSACTION_ERROR = (
+        "DB_2021-18641> {command_name} has failed: no transaction in progress"
+    )
 
 
 class MessageHandler:
@@ -91,6 +176,7 @@ class MessageHandler:
             MessageKeys.REFERENCE_TYPE_ERROR: MessageValues.REFERENCE_TYPE_ERROR,
             MessageKeys.REFERENCE_NON_PRIMARY_KEY_ERROR: MessageValues.REFERENCE_NON_PRIMARY_KEY_ERROR,
             MessageKeys.REFERENCE_EXISTENCE_ERROR: MessageValues.REFERENCE_EXISTENCE_ERROR,
+            MessageKeys.REFERENCE_SET_NULL_ERROR: MessageValues.REFERENCE_SET_NULL_ERROR,
             MessageKeys.PRIMARY_KEY_COLUMN_DEF_ERROR: MessageValues.PRIMARY_KEY_COLUMN_DEF_ERROR,
             MessageKeys.FOREIGN_KEY_COLUMN_DEF_ERROR: MessageValues.FOREIGN_KEY_COLUMN_DEF_ERROR,
             MessageKeys.TABLE_EXISTENCE_ERROR: MessageValues.TABLE_EXISTENCE_ERROR,
@@ -101,12 +187,31 @@ class MessageHandler:
             MessageKeys.INSERT_TYPE_MISMATCH_ERROR: MessageValues.INSERT_TYPE_MISMATCH_ERROR,
             MessageKeys.INSERT_COLUMN_EXISTENCE_ERROR: MessageValues.INSERT_COLUMN_EXISTENCE_ERROR,
             MessageKeys.INSERT_COLUMN_NON_NULLABLE_ERROR: MessageValues.INSERT_COLUMN_NON_NULLABLE_ERROR,
+            MessageKeys.INSERT_DUPLICATE_PRIMARY_KEY_ERROR: MessageValues.INSERT_DUPLICATE_PRIMARY_KEY_ERROR,
+            MessageKeys.INSERT_REFERENTIAL_INTEGRITY_ERROR: MessageValues.INSERT_REFERENTIAL_INTEGRITY_ERROR,
+            MessageKeys.DELETE_REFERENCED_ROW_ERROR: MessageValues.DELETE_REFERENCED_ROW_ERROR,
+            MessageKeys.UPDATE_TYPE_MISMATCH_ERROR: MessageValues.UPDATE_TYPE_MISMATCH_ERROR,
+            MessageKeys.UPDATE_COLUMN_EXISTENCE_ERROR: MessageValues.UPDATE_COLUMN_EXISTENCE_ERROR,
+            MessageKeys.UPDATE_COLUMN_NON_NULLABLE_ERROR: MessageValues.UPDATE_COLUMN_NON_NULLABLE_ERROR,
+            MessageKeys.UPDATE_DUPLICATE_PRIMARY_KEY_ERROR: MessageValues.UPDATE_DUPLICATE_PRIMARY_KEY_ERROR,
+            MessageKeys.UPDATE_REFERENTIAL_INTEGRITY_ERROR: MessageValues.UPDATE_REFERENTIAL_INTEGRITY_ERROR,
             MessageKeys.SELECT_COLUMN_RESOLVE_ERROR: MessageValues.SELECT_COLUMN_RESOLVE_ERROR,
             MessageKeys.SELECT_COLUMN_NOT_GROUPED: MessageValues.SELECT_COLUMN_NOT_GROUPED,
+            MessageKeys.SELECT_AGGREGATE_TYPE_ERROR: MessageValues.SELECT_AGGREGATE_TYPE_ERROR,
+            MessageKeys.AGGREGATE_NOT_ALLOWED: MessageValues.AGGREGATE_NOT_ALLOWED,
+            MessageKeys.SELECT_LIMIT_ERROR: MessageValues.SELECT_LIMIT_ERROR,
             MessageKeys.TABLE_NOT_SPECIFIED: MessageValues.TABLE_NOT_SPECIFIED,
             MessageKeys.COLUMN_NOT_EXIST: MessageValues.COLUMN_NOT_EXIST,
             MessageKeys.AMBIGUOUS_REFERENCE: MessageValues.AMBIGUOUS_REFERENCE,
             MessageKeys.INCOMPARABLE_ERROR: MessageValues.INCOMPARABLE_ERROR,
+            MessageKeys.INDEX_EXISTENCE_ERROR: MessageValues.INDEX_EXISTENCE_ERROR,
+            MessageKeys.INDEX_COLUMN_DEF_ERROR: MessageValues.INDEX_COLUMN_DEF_ERROR,
+            MessageKeys.DUPLICATE_INDEX_COLUMN_ERROR: MessageValues.DUPLICATE_INDEX_COLUMN_ERROR,
+            MessageKeys.NO_SUCH_INDEX: MessageValues.NO_SUCH_INDEX,
+            MessageKeys.COPY_FILE_ERROR: MessageValues.COPY_FILE_ERROR,
+            MessageKeys.COPY_ROW_ERROR: MessageValues.COPY_ROW_ERROR,
+            MessageKeys.TRANSACTION_IN_PROGRESS_ERROR: MessageValues.TRANSACTION_IN_PROGRESS_ERROR,
+            MessageKeys.NO_TRANSACTION_ERROR: MessageValues.NO_TRANSACTION_ERROR,
         }
         message_template = messages.get(message_type, "Unknown error")
         try:
@@ -125,7 +230,16 @@ class MessageHandler:
             MessageKeys.CREATE_TABLE_SUCCESS: MessageValues.CREATE_TABLE_SUCCESS,
             MessageKeys.DROP_SUCCESS: MessageValues.DROP_SUCCESS,
             MessageKeys.INSERT_RESULT: MessageValues.INSERT_RESULT,
+            MessageKeys.INSERT_ROWS_RESULT: MessageValues.INSERT_ROWS_RESULT,
             MessageKeys.DELETE_RESULT: MessageValues.DELETE_RESULT,
+            MessageKeys.UPDATE_RESULT: MessageValues.UPDATE_RESULT,
+            MessageKeys.CREATE_INDEX_SUCCESS: MessageValues.CREATE_INDEX_SUCCESS,
+            MessageKeys.DROP_INDEX_SUCCESS: MessageValues.DROP_INDEX_SUCCESS,
+            MessageKeys.COPY_RESULT: MessageValues.COPY_RESULT,
+            MessageKeys.ANALYZE_RESULT: MessageValues.ANALYZE_RESULT,
+            MessageKeys.BEGIN_SUCCESS: MessageValues.BEGIN_SUCCESS,
+            MessageKeys.COMMIT_SUCCESS: MessageValues.COMMIT_SUCCESS,
+            MessageKeys.ROLLBACK_SUCCESS: MessageValues.ROLLBACK_SUCCESS,
         }
         message_template = messages.get(message_type, "Unknown message")
         try:
@@ -1,4 +1,3 @@
-from datetime import datetime
 from formatter import Formatter
 
 # in this file, classes for describing metadata is defined.
@@ -12,12 +11,15 @@ class ForeignKeyMetadata:
         referenced_parent_table,
         referenced_parent_column_list,
         on_delete_action="no action",
+        index_name=None,
     ):
         self.child_table_name = child_table_name.lower()
         self.child_column_name_list = child_column_name_list
         self.referenced_parent_table = referenced_parent_table.lower()
         self.referenced_parent_column_list = referenced_parent_column_list
         self.on_delete_action = on_delete_action.lower()
+        # index on the child's foreign key columns
+        self.index_name = index_name
 
     # just for debugging
     def describe(self):
@@ -27,6 +29,19 @@ class ForeignKeyMetadata:
         )
 
 
+class IndexMetadata:
+    def __init__(self, index_name, table_name, column_list, index_id):
+        self.index_name = index_name.lower()
+        self.table_name = table_name.lower()
+        self.column_list = column_list
+        # numeric id used as the prefix of this index's entry keys
+        self.index_id = index_id
+
+    # just for debugging
+    def describe(self):
+        return f"INDEX: {self.index_name} ON {self.table_name}({', '.join(self.column_list)})"
+
+
 class TableMetadata:
     def __init__(
         self,
@@ -34,37 +49,27 @@ class TableMetadata:
         columns,
         pk_constraints: list = None,
         fk_constraints=None,
+        table_id=None,
     ):
         self.table_name = table_name.lower()
+        # numeric id used as the prefix of this table's row keys
+        self.table_id = table_id
+        # secondary indexes, index name -> IndexMetadata
+        self.indexes = {}
         self.columns = {col["name"].lower(): col for col in columns}
+        # rows are stored as tuples, holding values in column definition order
+        self.column_positions = {
+            col_name: position for position, col_name in enumerate(self.columns)
+        }
         self.pk_sets = pk_constraints[0]["key_list"] if pk_constraints else []
         self.fk_constraints = fk_constraints or []
-        self.dummy_row = self._generate_dummy_row()
-
-    def _generate_dummy_row(self):
-        dummy = {}
-        for col in self.columns.values():
-            col_name = col["name"]
-            col_type = col["type"]
-
-            # Assign default values based on type
-            if col_type == "int":
-                dummy[f"{self.table_name}.{col_name}"] = 0
-            elif col_type == "date":
-                dummy[f"{self.table_name}.{col_name}"] = datetime(
-                    1970, 1, 1
-                )  # Default to Unix epoch
-            elif col_type.startswith("char"):
-                n = int(col_type[5:-1])  # Extract size from "char(n)"
-                dummy[f"{self.table_name}.{col_name}"] = "a" * n
-        return dummy
-
-    def get_dummy_row(self):
-        return self.dummy_row
 
     def get_column(self, column_name):
         return self.columns.get(column_name.lower())
 
+    def get_column_position(self, column_name):
+        return self.column_positions[column_name.lower()]
+
     def describe(self):
         headers = ["column_name", "type", "null", "key"]
         rows = []
@@ -0,0 +1,450 @@
+import heapq
+import itertools
+import operator
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+from utils import comparable_value
+
+# in this file, physical operators used to evaluate SELECT are defined.
+# operators form a tree and are pulled from the root: iterating an operator
+# iterates its children lazily, so rows flow one at a time through the plan
+# and only blocking operators (hash join build side, aggregation, sort) hold
+# many rows, sort spilling them to disk past its memory budget. LIMIT stops
+# pulling rows once it has enough.
+
+
+# build a function extracting the join key of a row from the given column positions
+# NULL never matches anything, so rows holding NULL in a key column get None
+def make_join_key(column_positions):
+    def join_key(row):
+        key = []
+        for position in column_positions:
+            value = row[position]
+            if value is None:
+                return None
+            key.append(comparable_value(value))
+        return tuple(key)
+
+    return join_key
+
+
+class Operator:
+    def __init__(self, *children):
+        self.children = list(children)
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    # one line summary of the operator, shown by EXPLAIN
+    def describe(self):
+        return type(self).__name__
+
+
+# rows of a table, read through the access path the database picks for condition
+class Scan(Operator):
+    def __init__(self, database, table_metadata, condition):
+        super().__init__()
+        self.database = database
+        self.table_metadata = table_metadata
+        self.condition = condition
+
+    def __iter__(self):
+        for _, row in self.database.scan_table_candidates(
+            self.table_metadata, self.condition
+        ):
+            yield row
+
+    def describe(self):
+        access_path, _ = self.database.choose_access_path(
+            self.table_metadata, self.condition
+        )
+        return f"Scan on {self.table_metadata.table_name} ({access_path})"
+
+
+# condition is the condition predicate was compiled from, for describe
+class Filter(Operator):
+    def __init__(self, child, predicate, condition=None):
+        super().__init__(child)
+        self.predicate = predicate
+        self.condition = condition
+
+    def __iter__(self):
+        predicate = self.predicate
+        for row in self.children[0]:
+            if predicate(row):
+                yield row
+
+    def describe(self):
+        if self.condition is None:
+            return "Filter"
+        return f"Filter {self.condition}"
+
+
+# equi-join in O(n + m), output rows are the left tuple followed by the right tuple
+# the hash table is built on the smaller input and probed with the larger one:
+# both inputs are read in alternation until one of them ends, which is the
+# smaller one, the rest of the larger input is streamed. at most
+# 2 * min(n, m) + 1 rows are held at once
+class HashJoin(Operator):
+    def __init__(self, left, right, left_key, right_key, conditions=()):
+        super().__init__(left, right)
+        self.left_key = left_key
+        self.right_key = right_key
+        self.conditions = conditions  # join conditions the keys come from
+
+    def __iter__(self):
+        left_iter = iter(self.children[0])
+        right_iter = iter(self.children[1])
+        left_rows = []
+        right_rows = []
+        while True:
+            row = next(left_iter, None)
+            if row is None:
+                # the left input is the smaller one
+                hash_table = self.build(left_rows, self.left_key)
+                right_key = self.right_key
+                for rows in (right_rows, right_iter):
+                    for row in rows:
+                        key = right_key(row)
+                        if key is None:
+                            continue
+                        for matched_row in hash_table.get(key, ()):
+                            yield matched_row + row
+                return
+            left_rows.append(row)
+
+            row = next(right_iter, None)
+            if row is None:
+                break
+            right_rows.append(row)
+
+        hash_table = self.build(right_rows, self.right_key)
+        left_key = self.left_key
+        for rows in (left_rows, left_iter):
+            for row in rows:
+                key = left_key(row)
+                if key is None:
+                    continue
+                for matched_row in hash_table.get(key, ()):
+                    yield row + matched_row
+
+    def describe(self):
+        if not self.conditions:
+            return "HashJoin"
+        return "HashJoin on " + " AND ".join(str(c) for c in self.conditions)
+
+    @staticmethod
+    def build(rows, row_key):
+        hash_table = {}
+        for row in rows:
+            key = row_key(row)
+            if key is not None:
+                hash_table.setdefault(key, []).append(row)
+        return hash_table
+
+
+# fallback when no equality condition connects the two inputs
+class CrossJoin(Operator):
+    def __iter__(self):
+        right_rows = list(self.children[1])
+        for left_row in self.children[0]:
+            for right_row in right_rows:
+                yield left_row + right_row
+
+
+# how an aggregate folds a new non-NULL value into its accumulated value
+AGGREGATE_COMBINERS = {
+    "count": None,
+    "sum": operator.add,
+    "avg": operator.add,
+    "min": min,
+    "max": max,
+}
+
+
+# grouping in a single pass: each group keeps a (count, accumulated value)
+# state per aggregate in a hash table keyed on the GROUP BY values.
+# output rows are the group values followed by the aggregate results.
+# without GROUP BY columns the whole input is one group, even when empty
+class HashAggregate(Operator):
+    def __init__(self, child, group_positions, aggregates):
+        super().__init__(child)
+        self.group_positions = group_positions
+        # (function, position of the argument or None for COUNT(*))
+        self.aggregates = aggregates
+
+    def __iter__(self):
+        group_positions = self.group_positions
+        aggregates = [
+            (AGGREGATE_COMBINERS[function], position)
+            for function, position in self.aggregates
+        ]
+        groups = {}
+        for row in self.children[0]:
+            key = tuple(row[position] for position in group_positions)
+            states = groups.get(key)
+            if states is None:
+                states = groups[key] = [[0, None] for _ in aggregates]
+            for state, (combine, position) in zip(states, aggregates):
+                if position is None:
+                    state[0] += 1
+                    continue
+                # NULL is ignored by every aggregate
+                value = row[position]
+                if value is None:
+                    continue
+                if combine is not None:
+                    state[1] = value if state[0] == 0 else combine(state[1], value)
+                state[0] += 1
+
+        if not groups and not group_positions:
+            groups[()] = [[0, None] for _ in aggregates]
+        for key, states in groups.items():
+            yield key + self.finish(states)
+
+    # aggregate results of a group, NULL for an aggregate of no values
+    # except COUNT
+    def finish(self, states):
+        results = []
+        for (function, _), (count, value) in zip(self.aggregates, states):
+            if function == "count":
+                results.append(count)
+            elif function == "avg":
+                results.append(value / count if count else None)
+            else:
+                results.append(value)
+        return tuple(results)
+
+    def describe(self):
+        aggregates = ", ".join(
+            f"{function}(#{position})" if position is not None else f"{function}(*)"
+            for function, position in self.aggregates
+        )
+        groups = ", ".join(f"#{position}" for position in self.group_positions)
+        return f"HashAggregate by [{groups}] computing [{aggregates}]"
+
+
+# row order of ORDER BY: sort_keys are (position, descending) pairs, most
+# significant first. NULL sorts after every value in ascending order.
+# returns (key function, reverse) for sorted, heapq and heapq.merge;
+# mixed directions wrap descending values so a single ascending key works
+def make_sort_key(sort_keys):
+    positions = [position for position, _ in sort_keys]
+    reverse = sort_keys[0][1]
+    if all(descending == reverse for _, descending in sort_keys):
+
+        def sort_key(row):
+            return tuple(
+                (row[position] is None, row[position]) for position in positions
+            )
+
+        return sort_key, reverse
+
+    def sort_key(row):
+        return tuple(
+            (
+                Descending((row[position] is None, row[position]))
+                if descending
+                else (row[position] is None, row[position])
+            )
+            for position, descending in sort_keys
+        )
+
+    return sort_key, False
+
+
+def describe_sort_keys(sort_keys):
+    return ", ".join(
+        f"#{position} {'desc' if descending else 'asc'}"
+        for position, descending in sort_keys
+    )
+
+
+# a sort key value ordered in reverse
+class Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+# external merge sort: rows are collected until their estimated size exceeds
+# memory_budget (in bytes), then sorted and written to a temporary file as a
+# run. the runs and the rows left in memory are merged in one k-way pass.
+# every step is stable, rows with equal keys keep their input order
+class Sort(Operator):
+    # rows pickled together in a run file
+    RUN_CHUNK_SIZE = 1000
+
+    def __init__(self, child, sort_keys, memory_budget):
+        super().__init__(child)
+        self.sort_keys = sort_keys
+        self.memory_budget = memory_budget
+        self.run_count = 0  # runs spilled by the last iteration
+
+    def __iter__(self):
+        sort_key, reverse = make_sort_key(self.sort_keys)
+        runs = []
+        self.run_count = 0
+        try:
+            rows = []
+            size = 0
+            for row in self.children[0]:
+                rows.append(row)
+                size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+                if size > self.memory_budget:
+                    rows.sort(key=sort_key, reverse=reverse)
+                    runs.append(self.write_run(rows))
+                    self.run_count += 1
+                    rows = []
+                    size = 0
+            rows.sort(key=sort_key, reverse=reverse)
+
+            if not runs:
+                yield from rows
+                return
+            yield from heapq.merge(
+                *[self.read_run(run) for run in runs],
+                rows,
+                key=sort_key,
+                reverse=reverse,
+            )
+        finally:
+            for run in runs:
+                run.close()
+
+    def describe(self):
+        description = f"Sort by {describe_sort_keys(self.sort_keys)}"
+        if self.run_count:
+            description += f", {self.run_count} runs spilled to disk"
+        return description
+
+    def write_run(self, rows):
+        run = tempfile.TemporaryFile()
+        for start in range(0, len(rows), self.RUN_CHUNK_SIZE):
+            pickle.dump(rows[start : start + self.RUN_CHUNK_SIZE], run)
+        run.seek(0)
+        return run
+
+    @staticmethod
+    def read_run(run):
+        while True:
+            try:
+                rows = pickle.load(run)
+            except EOFError:
+                return
+            yield from rows
+
+
+# the first count rows of Sort with the same sort keys, selected with a
+# bounded heap in O(n log count) time holding only count rows
+class TopK(Operator):
+    def __init__(self, child, sort_keys, count):
+        super().__init__(child)
+        self.sort_keys = sort_keys
+        self.count = count
+
+    def __iter__(self):
+        sort_key, reverse = make_sort_key(self.sort_keys)
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        # both are stable, as sorted is
+        yield from select(self.count, self.children[0], key=sort_key)
+
+    def describe(self):
+        return f"TopK {self.count} by {describe_sort_keys(self.sort_keys)}"
+
+
+# skip offset rows, then pass at most count rows
+# the child is closed once enough rows are read, releasing its cursors
+class Limit(Operator):
+    def __init__(self, child, count, offset=0):
+        super().__init__(child)
+        self.count = count
+        self.offset = offset
+
+    def __iter__(self):
+        rows = iter(self.children[0])
+        try:
+            yield from itertools.islice(rows, self.offset, self.offset + self.count)
+        finally:
+            if hasattr(rows, "close"):
+                rows.close()
+
+    def describe(self):
+        return f"Limit {self.count} offset {self.offset}"
+
+
+# keep only the selected columns, in select list order
+class Project(Operator):
+    def __init__(self, child, column_positions):
+        super().__init__(child)
+        self.column_positions = column_positions
+
+    def __iter__(self):
+        column_positions = self.column_positions
+        for row in self.children[0]:
+            yield tuple(row[position] for position in column_positions)
+
+    def describe(self):
+        columns = ", ".join(f"#{position}" for position in self.column_positions)
+        return f"Project [{columns}]"
+
+
+# counts what an operator does for EXPLAIN ANALYZE: rows it output, times it
+# was iterated, wall time spent in it (including its children) and the
+# largest growth of allocated memory, measured with tracemalloc, since it
+# started while it was outputting rows
+class Analyze(Operator):
+    def __init__(self, operator):
+        super().__init__(operator)
+        self.rows = 0
+        self.loops = 0
+        self.time = 0.0
+        self.peak_memory = 0
+
+    def __iter__(self):
+        self.loops += 1
+        rows = iter(self.children[0])
+        start_memory, _ = tracemalloc.get_traced_memory()
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                finally:
+                    self.time += time.perf_counter() - started
+                    memory, _ = tracemalloc.get_traced_memory()
+                    self.peak_memory = max(self.peak_memory, memory - start_memory)
+                self.rows += 1
+                yield row
+        finally:
+            if hasattr(rows, "close"):
+                rows.close()
+
+    def describe(self):
+        return self.children[0].describe()
+
+
+# wrap every operator of a plan in Analyze, children first
+def analyze_plan(plan):
+    plan.children = [analyze_plan(child) for child in plan.children]
+    return Analyze(plan)
+
+
+# (depth, operator) of each operator of a plan, parents before children
+def walk_plan(plan, depth=0):
+    yield depth, plan
+    node = plan.children[0] if isinstance(plan, Analyze) else plan
+    for child in node.children:
+        yield from walk_plan(child, depth + 1)
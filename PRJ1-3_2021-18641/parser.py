@@ -1,7 +1,8 @@
-import datetime
 from lark import Token, Transformer, Tree
 from database import Database
+from plan_cache import convert_literal
 from utils import (
+    Aggregate,
     BooleanCondition,
     Condition,
     NullCondition,
@@ -18,6 +19,17 @@ class MyTransformer(Transformer):
     def __init__(self, database: Database):
         self.database = database
 
+    # transforming a command returns the prepared statements of its queries,
+    # None for queries which are not cached
+    def command(self, items):
+        return items[0]
+
+    def query_list(self, items):
+        return [item for item in items if not isinstance(item, Token)]
+
+    def query(self, items):
+        return items[0]
+
     def select_query_deprecated(self, items):
         from_clause = items[2].children[0]
         table_reference_list = from_clause.children[1]
@@ -86,6 +98,14 @@ class MyTransformer(Transformer):
                         referential_constraint, "table_name"
                     )
                     other_column_name_list = referential_constraint.children[5]
+                    on_delete_clause = referential_constraint.children[6]
+                    on_delete_action = "no action"
+                    if on_delete_clause is not None:
+                        on_delete_action = (
+                            "cascade"
+                            if on_delete_clause.children[2].type == "CASCADE"
+                            else "set null"
+                        )
 
                     for i in column_name_list.children[1:-1]:
                         key_list.append(i.children[0].lower())
@@ -97,6 +117,7 @@ class MyTransformer(Transformer):
                             "key_list": key_list,
                             "other_key_list": other_key_list,
                             "ref_table": other_table.children[0].lower(),
+                            "on_delete": on_delete_action,
                         }
                     )
         self.database.create_table(
@@ -106,6 +127,12 @@ class MyTransformer(Transformer):
     def parse_select_list(self, select_list):
         ret = []
         for select_item in select_list:
+            if (
+                select_item.children[0] is not None
+                and select_item.children[0].data == "aggregate_function"
+            ):
+                ret.append(self.parse_aggregate(select_item.children[0]))
+                continue
             table = (
                 select_item.children[0]
                 if select_item.children[0] is None
@@ -116,6 +143,24 @@ class MyTransformer(Transformer):
             ret.append(ColumnReference(table, column))
         return ret
 
+    # aggregate function names are identifiers in the grammar, an unknown
+    # name fails the transformation and is reported as a syntax error
+    def parse_aggregate(self, aggregate_function):
+        function = aggregate_function.children[0].lower()
+        if function not in Aggregate.FUNCTIONS:
+            raise ValueError(f"unknown aggregate function '{function}'")
+        if len(aggregate_function.children) == 3:
+            # COUNT(*) is the only aggregate taking no column
+            if function != "count":
+                raise ValueError(f"{function}(*) is not an aggregate")
+            return Aggregate(function, None)
+
+        table_name = aggregate_function.children[2]
+        if table_name is not None:
+            table_name = table_name.children[0].lower()
+        column_name = aggregate_function.children[3].children[0].lower()
+        return Aggregate(function, ColumnReference(table_name, column_name))
+
     def parse_join_clause(self, join_clause):
         ret = {}
         ret["tables"] = []
@@ -129,15 +174,33 @@ class MyTransformer(Transformer):
             join_condition = join_item.children[3].children
             ret["tables"].append(join_item.children[1].children[0].lower())
             col_ref_1 = ColumnReference(
-                join_condition[0].children[0], join_condition[1].children[0]
+                (
+                    join_condition[0]
+                    if join_condition[0] is None
+                    else join_condition[0].children[0].lower()
+                ),
+                join_condition[1].children[0].lower(),
             )
             col_ref_2 = ColumnReference(
-                join_condition[3].children[0], join_condition[4].children[0]
+                (
+                    join_condition[3]
+                    if join_condition[3] is None
+                    else join_condition[3].children[0].lower()
+                ),
+                join_condition[4].children[0].lower(),
             )
             ret["conditions"].append(Condition(col_ref_1, "=", col_ref_2))
         return ret
 
     def select_query(self, items):
+        return self.database.select_from_table(*items[0])
+
+    def explain_select_query(self, items):
+        self.database.explain_select(items[1] is not None, *items[2])
+
+    # arguments of Database.select_from_table, the statement is run by
+    # select_query or explained by explain_select_query
+    def select_statement(self, items):
         select_list = self.parse_select_list(items[1].children)
 
         from_clause_table = items[2].children[1].children[0].lower()
@@ -153,30 +216,85 @@ class MyTransformer(Transformer):
         else:
             where_condition = None
 
-        order_by_column = None
-        order_by_direction = None
-
+        group_by_columns = []
         if items[5] is not None:
-            order_by_column = items[5].children[2].children[0].lower()
-            order_by_direction = "asc"
-            if items[5].children[3] is not None:
-                order_by_direction = items[5].children[3].lower()
+            for group_by_item in items[5].children[2:]:
+                table_name = group_by_item.children[0]
+                if table_name is not None:
+                    table_name = table_name.children[0].lower()
+                group_by_columns.append(
+                    ColumnReference(
+                        table_name, group_by_item.children[1].children[0].lower()
+                    )
+                )
 
-        self.database.select_from_table(
+        if items[6] is not None:
+            having_clause = get_first_child_by_rule(items[6], "boolean_expr")
+            having_condition = self.parse_where_clause(having_clause)
+        else:
+            having_condition = None
+
+        # (column reference, "asc" or "desc") per sort key, most significant first
+        order_by_items = []
+        if items[7] is not None:
+            for order_by_item in items[7].children[2:]:
+                table_name = order_by_item.children[0]
+                if table_name is not None:
+                    table_name = table_name.children[0].lower()
+                order_by_direction = "asc"
+                if order_by_item.children[2] is not None:
+                    order_by_direction = order_by_item.children[2].lower()
+                order_by_items.append(
+                    (
+                        ColumnReference(
+                            table_name, order_by_item.children[1].children[0].lower()
+                        ),
+                        order_by_direction,
+                    )
+                )
+
+        # row counts are literals, so statements differing only in them
+        # share a cached plan
+        limit = None
+        offset = None
+        if items[8] is not None:
+            limit = LiteralValue(convert_literal(items[8].children[1]))
+            if items[8].children[3] is not None:
+                offset = LiteralValue(convert_literal(items[8].children[3]))
+
+        return (
             select_list,
             referred_tables,
             join_conditions,
             where_condition,
-            order_by_column,
-            order_by_direction,
+            group_by_columns,
+            having_condition,
+            order_by_items,
+            limit,
+            offset,
         )
 
+    def create_index_query(self, items):
+        index_name = items[2].children[0].lower()
+        table_name = items[4].children[0].lower()
+        column_list = [i.children[0].lower() for i in items[5].children[1:-1]]
+        self.database.create_index(index_name, table_name, column_list)
+
+    def drop_index_query(self, items):
+        self.database.drop_index(items[2].children[0].lower())
+
     def drop_table_query(self, items):
         self.database.drop_table(items[2].children[0])
 
     def show_tables_query(self, items):
         self.database.show_tables()
 
+    def analyze_query(self, items):
+        table_name = items[1]
+        if table_name is not None:
+            table_name = table_name.children[0].lower()
+        self.database.analyze_tables(table_name)
+
     def describe_query(self, items):
         self.database.describe_table(items[1].children[0], "Describe")
 
@@ -188,27 +306,66 @@ class MyTransformer(Transformer):
 
     def insert_query(self, items):
         table_name = items[2].children[0].lower()
-        values_list_wrapped = items[5].children[1:-1]
 
-        values = [
-            (
-                int(i.children[0].value)
-                if i.children[0].type == "INT"
-                else i.children[0].value.strip("'\"")
+        # one list of values per parenthesized tuple
+        values_list = []
+        for value_list in items[5:]:
+            values_list.append(
+                [
+                    (
+                        int(i.children[0].value)
+                        if i.children[0].type == "INT"
+                        else i.children[0].value.strip("'\"")
+                    )
+                    for i in value_list.children[1:-1]
+                ]
             )
-            for i in values_list_wrapped
-        ]
 
         column_name_list_tree = items[3]
         if column_name_list_tree == None:
-            self.database.insert_into_table(table_name, values)
+            self.database.insert_into_table(table_name, values_list)
         else:
             column_name_list = column_name_list_tree.children[1:-1]
             column_sequence = []
             for column_name_tree in column_name_list:
                 column_name = column_name_tree.children[0].lower()
                 column_sequence.append(column_name)
-            self.database.insert_into_table(table_name, values, column_sequence)
+            self.database.insert_into_table(table_name, values_list, column_sequence)
+
+    def copy_query(self, items):
+        table_name = items[1].children[0].lower()
+        file_name = items[3].value[1:-1]
+        self.database.copy_into_table(table_name, file_name)
+
+    def begin_query(self, items):
+        self.database.begin_transaction()
+
+    def commit_query(self, items):
+        self.database.commit_transaction()
+
+    def rollback_query(self, items):
+        self.database.rollback_transaction()
+
+    def update_query(self, items):
+        table_name = items[1].children[0].lower()
+
+        assignments = []
+        for assignment in items[3:-1]:
+            column_name = assignment.children[0].children[0].lower()
+            value = assignment.children[2]
+            if isinstance(value, Tree):
+                value = LiteralValue(convert_literal(value.children[0]))
+            else:
+                value = None
+            assignments.append((column_name, value))
+
+        if items[-1] is not None:
+            where_clause = get_first_child_by_rule(items[-1], "boolean_expr")
+            condition = self.parse_where_clause(where_clause)
+        else:
+            condition = None
+
+        return self.database.update_table(table_name, assignments, condition)
 
     def delete_query(self, items):
         table_name = items[2].children[0].lower()
@@ -220,7 +377,7 @@ class MyTransformer(Transformer):
         else:
             condition = None
 
-        self.database.delete_from_table(table_name, condition)
+        return self.database.delete_from_table(table_name, condition)
 
     def parse_where_clause(self, where_clause):
         if where_clause.data == "boolean_expr":
@@ -229,10 +386,10 @@ class MyTransformer(Transformer):
                 for child in where_clause.children
                 if isinstance(child, Tree)
             ]
-            if len(terms) == 1:
-                return terms[0]
-            else:
-                return BooleanCondition(terms[0], "OR", terms[1])
+            condition = terms[0]
+            for term in terms[1:]:
+                condition = BooleanCondition(condition, "OR", term)
+            return condition
 
         elif where_clause.data == "boolean_term":
             factors = [
@@ -240,10 +397,10 @@ class MyTransformer(Transformer):
                 for child in where_clause.children
                 if isinstance(child, Tree)
             ]
-            if len(factors) == 1:
-                return factors[0]
-            else:
-                return BooleanCondition(factors[0], "AND", factors[1])
+            condition = factors[0]
+            for factor in factors[1:]:
+                condition = BooleanCondition(condition, "AND", factor)
+            return condition
 
         elif where_clause.data == "boolean_factor":
             if where_clause.children[0] is None:
@@ -285,19 +442,13 @@ class MyTransformer(Transformer):
             operand.children[0] is not None
             and operand.children[0].data == "comparable_value"
         ):
-            value = operand.children[0].children[0].value
-
-            # Handle different types of comparable values
-            if operand.children[0].children[0].type == "STR":
-                # Strip quotation marks from the string value
-                return LiteralValue(value.strip("'\""))
-            elif operand.children[0].children[0].type == "DATE":
-                # Convert string to datetime object
-                parsed_date = datetime.datetime.strptime(value, "%Y-%m-%d")
-                return LiteralValue(parsed_date)
-            elif operand.children[0].children[0].type == "INT":
-                # Convert string to integer
-                return LiteralValue(int(value))
+            return LiteralValue(convert_literal(operand.children[0].children[0]))
+
+        elif (
+            operand.children[0] is not None
+            and operand.children[0].data == "aggregate_function"
+        ):
+            return self.parse_aggregate(operand.children[0])
 
         else:
             table_name = None
@@ -0,0 +1,88 @@
+import datetime
+from collections import OrderedDict
+
+# in this file, the cache of prepared statements is defined.
+# statements are keyed on their token stream with literal values left out,
+# so "where id = 1" and "where id = 2" share one bound, validated plan and
+# only the literal values are substituted before it is executed again.
+
+LITERAL_TOKEN_TYPES = ("INT", "STR", "DATE")
+
+
+# value of a literal token, as the transformer converts it in a WHERE clause
+def convert_literal(token):
+    if token.type == "STR":
+        return token.value.strip("'\"")
+    elif token.type == "DATE":
+        return datetime.datetime.strptime(token.value, "%Y-%m-%d")
+    return int(token.value)
+
+
+# (cache key, literal values in statement order) of a lexed statement
+# a literal keeps only its token type in the key: values of another type
+# would change the result of the type checks done while binding.
+# returns None if a literal can not be converted, the parser reports it
+def normalize_statement(tokens):
+    key = []
+    literal_values = []
+    for token in tokens:
+        if token.type in LITERAL_TOKEN_TYPES:
+            try:
+                literal_values.append(convert_literal(token))
+            except ValueError:
+                return None
+            key.append(token.type)
+        else:
+            key.append((token.type, token.value))
+    return tuple(key), literal_values
+
+
+# a bound and validated statement, executed by calling function with args
+# literals are the LiteralValue objects of the statement in statement order
+class PreparedStatement:
+    def __init__(self, table_names, literals, function, *args):
+        self.table_names = set(table_names)
+        self.literals = literals
+        self.function = function
+        self.args = args
+
+    def bind_literals(self, literal_values):
+        for literal, value in zip(self.literals, literal_values):
+            literal.value = value
+
+    def execute(self):
+        self.function(*self.args)
+
+
+# least recently used statements are evicted once capacity is reached
+class PlanCache:
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.statements = OrderedDict()
+
+    def get(self, key):
+        statement = self.statements.get(key)
+        if statement is not None:
+            self.statements.move_to_end(key)
+        return statement
+
+    def put(self, key, statement, literal_count):
+        # literals outside the bound conditions can not be substituted
+        if len(statement.literals) != literal_count:
+            return
+        self.statements[key] = statement
+        self.statements.move_to_end(key)
+        if len(self.statements) > self.capacity:
+            self.statements.popitem(last=False)
+
+    def clear(self):
+        self.statements.clear()
+
+    # drop every statement referring to table_name, its schema has changed
+    def invalidate(self, table_name):
+        for key in [
+            key
+            for key, statement in self.statements.items()
+            if table_name in statement.table_names
+        ]:
+            del self.statements[key]
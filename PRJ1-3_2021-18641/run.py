@@ -2,10 +2,16 @@ from lark import Lark, LarkError
 from database import Database
 from parser import MyTransformer
 from messages import MessageHandler, MessageKeys
+from plan_cache import normalize_statement
 
 # Load sql parser declared in grammar.lark
+# the grammar is LALR(1), so statements are parsed in linear time without
+# the Earley chart; cache=True stores the built parse table in the temp
+# directory keyed by the grammar hash, so later launches skip building it
 with open("grammar.lark") as file:
-    sql_parser = Lark(file.read(), start="command", lexer="basic")
+    sql_parser = Lark(
+        file.read(), start="command", lexer="basic", parser="lalr", cache=True
+    )
 
 # Create an Instance of Database and MyTransformer
 database = Database()
@@ -34,17 +40,45 @@ def handleInput():
 # Main loop
 # Receive input query(queries) and split each query into list for executing
 while True:
+    # the session goes idle waiting for the next input,
+    # the commits of the last input are made durable first
+    database.flush_log()
     inputQuery = handleInput()
 
     # Remove last element which is empty string due to last semicolon
     splittedQueries = inputQuery.split(";")[:-1]
 
     # Parse and transform each query
+    # Every query is parsed, a query of the same shape as a cached one then
+    # skips transforming and binding, it only substitutes its literal values
+    # into the cached statement
+    # Each query runs in its own transaction, see Database.statement
+    # Lexing and parsing read nothing, so they are done before it begins and
+    # a syntax error leaves the transaction and the cached state untouched
     # Break the loop if a LarkError occurs (syntax error)
     for query in splittedQueries:
         try:
-            parsedQuery = sql_parser.parse(query + ";")
-            transformer.transform(parsedQuery)
+            # the plan cache key is built from the tokens the parser consumes,
+            # so each query is lexed once. lexing apart from the parser builds
+            # a new lexer per query, which costs more than the LALR parse
+            interactive = sql_parser.parse_interactive(query + ";")
+            tokens = list(interactive.iter_parse())
+            parsedQuery = interactive.feed_eof(tokens[-1])
+            normalized = normalize_statement(tokens)
+            with database.statement():
+                if normalized is not None:
+                    statement_key, literal_values = normalized
+                    statement = database.plan_cache.get(statement_key)
+                    if statement is not None:
+                        statement.bind_literals(literal_values)
+                        statement.execute()
+                        continue
+
+                statements = transformer.transform(parsedQuery)
+                if normalized is not None and statements[0] is not None:
+                    database.plan_cache.put(
+                        statement_key, statements[0], len(literal_values)
+                    )
         except LarkError as e:
             MessageHandler.print_error(MessageKeys.SYNTAX_ERROR)
             break
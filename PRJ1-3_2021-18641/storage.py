@@ -0,0 +1,145 @@
+import pickle
+import struct
+from utils import comparable_value
+
+# in this file, the key layout of the record store is defined.
+# every record key starts with a one-byte tag followed by a table or index id,
+# so the records of one table or index occupy their own contiguous range
+# of the B-tree:
+#   r | table_id (4 bytes) | row_id (8 bytes)  ->  pickled row
+#   p | table_id (4 bytes) | encoded primary key  ->  row_id
+#   i | index_id (4 bytes) | encoded index key | row_id (8 bytes)  ->  empty
+# catalog keys are text such as "table_schema:..." and share the tag ranges:
+# "index_schema:..." starts with the i tag, its next four bytes "ndex" read
+# as an index id far beyond any allocated one, so it never falls in the
+# range of an index
+
+ROW_TAG = b"r"
+PRIMARY_KEY_TAG = b"p"
+INDEX_TAG = b"i"
+
+NEXT_TABLE_ID_KEY = b"next_table_id"
+NEXT_INDEX_ID_KEY = b"next_index_id"
+
+_TABLE_ID = struct.Struct(">I")
+_ROW_ID = struct.Struct(">Q")
+
+
+def row_key_prefix(table_id):
+    return ROW_TAG + _TABLE_ID.pack(table_id)
+
+
+def row_key(table_id, row_id):
+    return ROW_TAG + _TABLE_ID.pack(table_id) + _ROW_ID.pack(row_id)
+
+
+def row_id_from_key(key):
+    return _ROW_ID.unpack_from(key, 1 + _TABLE_ID.size)[0]
+
+
+def primary_key_prefix(table_id):
+    return PRIMARY_KEY_TAG + _TABLE_ID.pack(table_id)
+
+
+def primary_key(table_id, values):
+    return PRIMARY_KEY_TAG + _TABLE_ID.pack(table_id) + encode_key(values)
+
+
+def index_prefix(index_id):
+    return INDEX_TAG + _TABLE_ID.pack(index_id)
+
+
+# the row id suffix keeps entries of equal index keys distinct
+def index_key(index_id, values, row_id):
+    return (
+        INDEX_TAG + _TABLE_ID.pack(index_id) + encode_key(values) + _ROW_ID.pack(row_id)
+    )
+
+
+def row_id_from_index_key(key):
+    return _ROW_ID.unpack_from(key, len(key) - _ROW_ID.size)[0]
+
+
+# key range [start, end) of the index entries under prefix matching
+# the bounds produced by utils.find_index_bounds
+def index_key_range(prefix, eq_values, lower, upper):
+    prefix = prefix + encode_key(eq_values)
+    if lower is not None:
+        value, inclusive = lower
+        start = prefix + encode_value(value)
+        if not inclusive:
+            start = prefix_end(start)
+    elif upper is not None:
+        # NULL is encoded as 0x00 and never satisfies a comparison
+        start = prefix + b"\x01"
+    else:
+        start = prefix
+
+    if upper is not None:
+        value, inclusive = upper
+        end = prefix + encode_value(value)
+        if inclusive:
+            end = prefix_end(end)
+    else:
+        end = prefix_end(prefix)
+    return start, end
+
+
+# order preserving encoding of column values:
+# comparing two encoded keys bytewise gives the same result as comparing
+# the values, so B-tree range scans follow value order
+def encode_value(value):
+    if value is None:
+        return b"\x00"
+    if isinstance(value, int):
+        # length prefixed magnitude, negative numbers are stored complemented
+        length = (abs(value).bit_length() + 7) // 8
+        if value >= 0:
+            return b"\x01" + bytes([0x80 + length]) + value.to_bytes(length, "big")
+        return (
+            b"\x01"
+            + bytes([0x80 - length])
+            + ((1 << (8 * length)) - 1 + value).to_bytes(length, "big")
+        )
+    if isinstance(value, str):
+        # 0x00 is escaped so the 0x00 0x00 terminator sorts before any character
+        return (
+            b"\x02"
+            + comparable_value(value).encode().replace(b"\x00", b"\x00\xff")
+            + b"\x00\x00"
+        )
+    return b"\x03" + _TABLE_ID.pack(value.toordinal())
+
+
+def encode_key(values):
+    return b"".join(encode_value(value) for value in values)
+
+
+# smallest key greater than every key starting with prefix
+def prefix_end(prefix):
+    prefix = prefix.rstrip(b"\xff")
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+def encode_row(row):
+    return pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_row(row_serialized):
+    return pickle.loads(row_serialized)
+
+
+def encode_row_id(row_id):
+    return _ROW_ID.pack(row_id)
+
+
+def decode_row_id(row_id_serialized):
+    return _ROW_ID.unpack(row_id_serialized)[0]
+
+
+def encode_counter(value):
+    return _ROW_ID.pack(value)
+
+
+def decode_counter(value_serialized):
+    return _ROW_ID.unpack(value_serialized)[0]
@@ -0,0 +1,152 @@
+import bisect
+import datetime
+import random
+from utils import comparable_value
+
+# in this file, the statistics collected on tables by ANALYZE are defined.
+# they describe the rows as they were when ANALYZE last ran and are used to
+# estimate how many rows a condition selects, e.g. to pick an access path.
+
+# buckets of an equi-depth histogram
+HISTOGRAM_BUCKETS = 32
+
+# rows sampled per table to estimate distinct counts and build the histograms
+SAMPLE_SIZE = 30000
+
+
+class ColumnStatistics:
+    def __init__(self, distinct_count, null_fraction, min_value, max_value, histogram):
+        self.distinct_count = distinct_count  # distinct non-NULL values
+        self.null_fraction = null_fraction
+        self.min_value = min_value
+        self.max_value = max_value
+        # sorted bucket bounds, each bucket holding as many sampled values
+        self.histogram = histogram
+
+    # estimated fraction of the rows holding value
+    def equal_fraction(self, value):
+        if self.distinct_count == 0:
+            return 0.0
+        return (1 - self.null_fraction) / self.distinct_count
+
+    # estimated fraction of the rows between the bounds, which are
+    # (value, inclusive) or None as find_index_bounds returns them
+    def range_fraction(self, lower, upper):
+        low = 0.0 if lower is None else self.cumulative_fraction(lower[0])
+        high = 1.0 if upper is None else self.cumulative_fraction(upper[0])
+        return (1 - self.null_fraction) * max(high - low, 0.0)
+
+    # estimated fraction of the non-NULL values below value, interpolated
+    # within a bucket for numbers and dates
+    def cumulative_fraction(self, value):
+        bounds = self.histogram
+        if not bounds or value <= bounds[0]:
+            return 0.0
+        if value >= bounds[-1]:
+            return 1.0
+        bucket = bisect.bisect_right(bounds, value) - 1
+        low, high = bounds[bucket], bounds[bucket + 1]
+        within = 0.5
+        if isinstance(value, int) and high > low:
+            within = (value - low) / (high - low)
+        elif isinstance(value, datetime.datetime) and high > low:
+            within = (value - low) / (high - low)
+        return (bucket + within) / (len(bounds) - 1)
+
+
+class TableStatistics:
+    def __init__(self, row_count, columns: dict[str, ColumnStatistics]):
+        self.row_count = row_count
+        self.columns = columns
+
+    # estimated fraction of the rows an index scan over column_list reads,
+    # for the bounds find_index_bounds returns. columns are assumed to be
+    # independent of each other
+    def estimate_fraction(self, column_list, eq_values, lower, upper):
+        fraction = 1.0
+        for column_name, value in zip(column_list, eq_values):
+            fraction *= self.columns[column_name].equal_fraction(value)
+        if lower is not None or upper is not None:
+            fraction *= self.columns[column_list[len(eq_values)]].range_fraction(
+                lower, upper
+            )
+        return fraction
+
+
+# bounds of an equi-depth histogram of sorted values
+def build_histogram(values):
+    if not values:
+        return []
+    bucket_count = min(HISTOGRAM_BUCKETS, len(values))
+    bounds = [values[i * len(values) // bucket_count] for i in range(bucket_count)]
+    bounds.append(values[-1])
+    return bounds
+
+
+# distinct values among value_count non-NULL values, estimated from the
+# sampled ones with the estimator of Haas and Stokes: values seen once in
+# the sample hint at values left out of it, repeated values at few of them
+def estimate_distinct_count(sampled_values, value_count):
+    counts = {}
+    for value in sampled_values:
+        counts[value] = counts.get(value, 0) + 1
+    sample_count = len(sampled_values)
+    if sample_count == value_count:
+        return len(counts)
+    # a sparse column may be NULL in every sampled row
+    if sample_count == 0:
+        return min(1, value_count)
+    seen_once = sum(1 for count in counts.values() if count == 1)
+    estimate = (sample_count * len(counts)) / (
+        sample_count - seen_once + seen_once * sample_count / value_count
+    )
+    return round(min(max(estimate, len(counts)), value_count))
+
+
+# statistics of the rows of a table, read in a single pass holding at most
+# SAMPLE_SIZE rows: row count, NULL counts and min/max are exact, distinct
+# counts and histograms are estimated from a reservoir sample of the rows
+def collect_statistics(table_metadata, rows):
+    columns = list(table_metadata.columns.values())
+    has_char = any(col["type"].startswith("char") for col in columns)
+    # a fixed seed keeps ANALYZE of the same rows repeatable
+    sampler = random.Random(0)
+
+    row_count = 0
+    null_counts = [0] * len(columns)
+    min_values = [None] * len(columns)
+    max_values = [None] * len(columns)
+    sample = []
+    for row in rows:
+        row_count += 1
+        if has_char:
+            row = tuple(comparable_value(value) for value in row)
+        for position, value in enumerate(row):
+            if value is None:
+                null_counts[position] += 1
+                continue
+            if min_values[position] is None or value < min_values[position]:
+                min_values[position] = value
+            if max_values[position] is None or value > max_values[position]:
+                max_values[position] = value
+
+        if len(sample) < SAMPLE_SIZE:
+            sample.append(row)
+        else:
+            index = sampler.randrange(row_count)
+            if index < SAMPLE_SIZE:
+                sample[index] = row
+
+    column_statistics = {}
+    for position, col in enumerate(columns):
+        sampled_values = sorted(
+            row[position] for row in sample if row[position] is not None
+        )
+        column_statistics[col["name"]] = ColumnStatistics(
+            estimate_distinct_count(sampled_values, row_count - null_counts[position]),
+            null_counts[position] / row_count if row_count else 0.0,
+            min_values[position],
+            max_values[position],
+            build_histogram(sampled_values),
+        )
+    return TableStatistics(row_count, column_statistics)
@@ -1,3 +1,6 @@
+import operator
+
+
 # util funtion for readibility
 def get_first_child_by_rule(tree, rule_name):
     for child in tree.children:
@@ -22,15 +25,67 @@ class AmbiguousReference(Exception):
     pass
 
 
+class TypeMismatchError(Exception):
+    pass
+
+
+class NonNullableError(Exception):
+    pass
+
+
+class AggregateNotAllowed(Exception):
+    pass
+
+
+# a column selected or ordered by in a grouped query, which is not grouped
+class ColumnNotGrouped(Exception):
+    def __init__(self, column_name):
+        super().__init__(column_name)
+        self.column_name = column_name
+
+
+# SUM or AVG of a column which does not hold numbers
+class AggregateTypeError(Exception):
+    def __init__(self, function_name, column_name):
+        super().__init__(function_name, column_name)
+        self.function_name = function_name
+        self.column_name = column_name
+
+
+# a value list which can not be stored as a row of the table,
+# message_key and kwargs describe the failure for MessageHandler.print_error
+class InsertError(Exception):
+    def __init__(self, message_key, **kwargs):
+        super().__init__(message_key)
+        self.message_key = message_key
+        self.kwargs = kwargs
+
+
 class ColumnReference:
     def __init__(self, table, column):
         self.table = table
         self.column = column
 
     def __str__(self):
+        if self.table is None:
+            return self.column
         return f"{self.table}.{self.column}"
 
 
+# aggregate function of a select list or HAVING clause
+class Aggregate:
+    FUNCTIONS = ("count", "sum", "avg", "min", "max")
+
+    def __init__(self, function, column_reference):
+        self.function = function  # one of FUNCTIONS
+        self.column_reference = column_reference  # None for COUNT(*)
+
+    def __str__(self):
+        if self.column_reference is None:
+            return f"{self.function}(*)"
+        return f"{self.function}({self.column_reference})"
+
+
 class LiteralValue:
     def __init__(self, value):
         self.value = value
@@ -72,59 +127,244 @@ class BooleanCondition:
         return f"({str(self.left)} {self.operator} {str(self.right)})"
 
 
-def evaluate_condition(condition, row, from_tables):
-    if isinstance(condition, Condition):
-        left_value = get_value(condition.left_operand, row, from_tables)
-        right_value = get_value(condition.right_operand, row, from_tables)
-
-        # Type compatibility check
-        if type(left_value) != type(right_value):
-            raise IncomparableTypeError()
-
-        if isinstance(left_value, str):
-            left_value = left_value.rstrip()
-        if isinstance(right_value, str):
-            right_value = right_value.rstrip()
-
-        # Null handling
-        if left_value is None or right_value is None:
-            return False
-
-        # Actual comparison
-        if condition.operator == "=":
-            return left_value == right_value
-        elif condition.operator == "!=":
-            return left_value != right_value
-        elif condition.operator == "<":
-            return left_value < right_value
-        elif condition.operator == ">":
-            return left_value > right_value
-        elif condition.operator == "<=":
-            return left_value <= right_value
-        elif condition.operator == ">=":
-            return left_value >= right_value
-
-
-def get_value(operand, row, from_tables):
-    if isinstance(operand, ColumnReference):
-        if operand.table is not None:
-            if operand.table not in from_tables:
-                raise TableNotSpecified
-            value = row.get(f"{operand.table}.{operand.column}", None)
-            if value is None:
-                raise ColumnNotFoundError
-            return value
+# a value as it is compared: char values are padded on insert and compared
+# without the padding, other values are compared as they are
+def comparable_value(value):
+    return value.rstrip() if isinstance(value, str) else value
+
+
+# operator seen from the other side, "3 < col" is "col > 3"
+FLIPPED_OPERATORS = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+COMPARISON_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+# compile a condition tree into a function row -> bool, once per query
+# column references are resolved by the binder and operand types are checked
+# here, so reference and type errors are raised before any row is evaluated
+def compile_condition(condition, binder):
+    if isinstance(condition, BooleanCondition):
+        left = compile_condition(condition.left, binder)
+        if condition.operator == "NOT":
+            return lambda row: not left(row)
+        right = compile_condition(condition.right, binder)
+        if condition.operator == "AND":
+            return lambda row: left(row) and right(row)
+        return lambda row: left(row) or right(row)
+
+    if isinstance(condition, NullCondition):
+        key = binder.bind(condition.column_reference).key
+        if condition.is_not_null:
+            return lambda row: row[key] is not None
+        return lambda row: row[key] is None
+
+    compare = COMPARISON_OPERATORS[condition.operator]
+    left_type, left_key, left_value = compile_operand(condition.left_operand, binder)
+    right_type, right_key, right_value = compile_operand(
+        condition.right_operand, binder
+    )
+
+    # Type compatibility check
+    if left_type != right_type:
+        raise IncomparableTypeError()
+    is_char = left_type is str
+
+    if left_key is None and right_key is None:
+        result = compare(left_value, right_value)
+        return lambda row: result
+
+    if right_key is None:
+        return compile_comparison(compare, left_key, right_value, is_char)
+    if left_key is None:
+        return compile_comparison(
+            COMPARISON_OPERATORS[FLIPPED_OPERATORS[condition.operator]],
+            right_key,
+            left_value,
+            is_char,
+        )
+
+    # Null handling: comparison with null is false
+    if is_char:
+
+        def compare_columns(row):
+            left, right = row[left_key], row[right_key]
+            return (
+                left is not None
+                and right is not None
+                and compare(comparable_value(left), comparable_value(right))
+            )
+
+    else:
+
+        def compare_columns(row):
+            left, right = row[left_key], row[right_key]
+            return left is not None and right is not None and compare(left, right)
+
+    return compare_columns
+
+
+# (value type, row key, constant value) of an operand
+# columns and aggregates have no constant value, literals have no row key
+def compile_operand(operand, binder):
+    if isinstance(operand, (ColumnReference, Aggregate)):
+        bound_column = binder.bind(operand)
+        return bound_column.value_type(), bound_column.key, None
+    value = operand.value
+    return type(value), None, comparable_value(value)
+
+
+# column compared with a constant
+def compile_comparison(compare, key, constant, is_char):
+    if is_char:
+
+        def compare_column(row):
+            value = row[key]
+            return value is not None and compare(comparable_value(value), constant)
+
+    else:
+
+        def compare_column(row):
+            value = row[key]
+            return value is not None and compare(value, constant)
+
+    return compare_column
+
+
+# split a WHERE condition into the list of its top level AND operands
+def split_conjuncts(condition):
+    if condition is None:
+        return []
+    if isinstance(condition, BooleanCondition) and condition.operator == "AND":
+        return split_conjuncts(condition.left) + split_conjuncts(condition.right)
+    return [condition]
+
+
+# rebuild an AND condition from a list of conjuncts, None for an empty list
+def combine_conjuncts(conjuncts):
+    if not conjuncts:
+        return None
+    condition = conjuncts[0]
+    for conjunct in conjuncts[1:]:
+        condition = BooleanCondition(condition, "AND", conjunct)
+    return condition
+
+
+# set of tables whose columns are referenced by condition
+def get_referenced_tables(condition, binder):
+    if isinstance(condition, BooleanCondition):
+        referenced_tables = get_referenced_tables(condition.left, binder)
+        if condition.right is not None:
+            referenced_tables |= get_referenced_tables(condition.right, binder)
+        return referenced_tables
+    if isinstance(condition, NullCondition):
+        operands = [condition.column_reference]
+    else:
+        operands = [condition.left_operand, condition.right_operand]
+    return {
+        binder.bind(operand).table_name
+        for operand in operands
+        if isinstance(operand, ColumnReference)
+    }
+
+
+# collect "column op literal" conjuncts of condition on columns of the table,
+# as {column_name: [(operator, value), ...]}
+def collect_column_predicates(condition, table_metadata):
+    predicates = {}
+    for conjunct in split_conjuncts(condition):
+        if not isinstance(conjunct, Condition):
+            continue
+        if isinstance(conjunct.left_operand, ColumnReference) and isinstance(
+            conjunct.right_operand, LiteralValue
+        ):
+            column, literal = conjunct.left_operand, conjunct.right_operand
+            operator = conjunct.operator
+        elif isinstance(conjunct.right_operand, ColumnReference) and isinstance(
+            conjunct.left_operand, LiteralValue
+        ):
+            column, literal = conjunct.right_operand, conjunct.left_operand
+            operator = FLIPPED_OPERATORS[conjunct.operator]
         else:
-            matching_columns = [
-                value
-                for key, value in row.items()
-                if key.endswith(f".{operand.column}")
-            ]
-            if len(matching_columns) == 0:
-                raise ColumnNotFoundError
-            elif len(matching_columns) > 1:
-                raise AmbiguousReference
-            return matching_columns[0]
-    elif isinstance(operand, LiteralValue):
-        return operand.value
-    return None
+            continue
+        if column.table is not None and column.table != table_metadata.table_name:
+            continue
+        if not table_metadata.get_column(column.column):
+            continue
+        predicates.setdefault(column.column, []).append((operator, literal.value))
+    return predicates
+
+
+# values of the primary key fixed by "column = literal" predicates,
+# in primary key column order. None if some primary key column is not fixed
+def find_primary_key_values(predicates, pk_sets):
+    if not pk_sets:
+        return None
+
+    pk_values = []
+    for pk_column in pk_sets:
+        values = [value for op, value in predicates.get(pk_column, []) if op == "="]
+        if not values:
+            return None
+        pk_values.append(values[0])
+    return pk_values
+
+
+# bounds of an index scan over column_list usable for the predicates:
+# (equality values of the leading columns, lower bound, upper bound)
+# where the bounds restrict the next column as (value, inclusive) or None.
+# returns None if the index can not narrow the scan
+def find_index_bounds(predicates, column_list):
+    eq_values = []
+    for column_name in column_list:
+        values = [value for op, value in predicates.get(column_name, []) if op == "="]
+        if not values:
+            break
+        eq_values.append(values[0])
+
+    lower = upper = None
+    if len(eq_values) < len(column_list):
+        for op, value in predicates.get(column_list[len(eq_values)], []):
+            compared = comparable_value(value)
+            if op in (">", ">="):
+                inclusive = op == ">="
+                if (
+                    lower is None
+                    or compared > lower[0]
+                    or (compared == lower[0] and not inclusive)
+                ):
+                    lower = (compared, inclusive)
+            elif op in ("<", "<="):
+                inclusive = op == "<="
+                if (
+                    upper is None
+                    or compared < upper[0]
+                    or (compared == upper[0] and not inclusive)
+                ):
+                    upper = (compared, inclusive)
+
+    if not eq_values and lower is None and upper is None:
+        return None
+    return eq_values, lower, upper
+
+
+# LiteralValue operands of condition, in the order they appear in the statement
+def collect_literals(condition):
+    if condition is None:
+        return []
+    if isinstance(condition, BooleanCondition):
+        return collect_literals(condition.left) + collect_literals(condition.right)
+    if isinstance(condition, NullCondition):
+        return []
+    return [
+        operand
+        for operand in (condition.left_operand, condition.right_operand)
+        if isinstance(operand, LiteralValue)
+    ]